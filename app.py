@@ -97,7 +97,7 @@ except ImportError as e:
 # Initialize storage system
 try:
     # Import storage factory
-    from utils.storage_factory import initialize_storage, get_storage
+    from utils.storage_factory import initialize_storage, get_storage, warmup
 
     # Initialize all configured storage backends with retry logic
     max_attempts = 3
@@ -109,6 +109,9 @@ try:
             # Get the active storage backend
             storage = get_storage()
             logger.info(f"Storage initialized successfully using: {config.STORAGE_MODE}")
+            
+            # Prime token refresh and connections off the request path
+            warmup()
             break
         except Exception as e:
             if attempt < max_attempts:
@@ -461,15 +464,12 @@ def upload_model():
         from utils.dropbox_storage import get_dropbox_storage
         dropbox_storage = get_dropbox_storage()
         
-        # Read the file content directly to memory and upload to Dropbox
-        model_data = model_file.read()
-        file_size = len(model_data)
-        
-        # Upload directly to Dropbox
-        upload_result = dropbox_storage.upload_model(model_data, unique_filename)
+        # Stream the uploaded file straight to Dropbox
+        upload_result = dropbox_storage.upload_model(model_file.stream, unique_filename)
         
         if not upload_result.get('success', False):
             return jsonify({'success': False, 'message': f"Error uploading to Dropbox: {upload_result.get('error', 'Unknown error')}"}), 500
+        file_size = upload_result['size']
         
         # Get the Dropbox path for reference
         dropbox_path = upload_result.get('path', '')
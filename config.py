@@ -244,6 +244,15 @@ GOOGLE_DRIVE_MODELS_FOLDER = os.getenv("GOOGLE_DRIVE_MODELS_FOLDER", "backdoor_m
 # Base model name (used to identify the model in storage)
 BASE_MODEL_NAME = os.getenv("BASE_MODEL_NAME", "model_1.0.0.mlmodel")
 
+# Run sample predictions when validating the base model (requires a full model load)
+VALIDATE_WITH_PREDICTIONS = os.getenv("VALIDATE_WITH_PREDICTIONS", "True").lower() in ["true", "1", "yes"]
+
+# Seconds a remote model listing is reused before asking the provider again
+STORAGE_CACHE_TTL = float(os.getenv("STORAGE_CACHE_TTL", "30"))
+
+# Bytes of downloaded model content kept in memory for repeat downloads (0 disables)
+STORAGE_MODEL_CACHE_BYTES = int(os.getenv("STORAGE_MODEL_CACHE_BYTES", str(64 * 1024 * 1024)))
+
 # Memory management settings
 # For platforms with memory constraints, tune these settings
 MEMORY_OPTIMIZED = os.getenv("MEMORY_OPTIMIZED", "True").lower() in ["true", "1", "yes"]
@@ -117,7 +117,7 @@ def clean_old_models(model_dir: str = None, keep_newest: int = config.MAX_MODELS
     """
     try:
         # Use storage factory to get appropriate storage backend
-        from utils.storage_factory import get_storage
+        from utils.storage_factory import get_storage, delete_models
         storage = get_storage()
         
         # List all models from storage
@@ -157,16 +157,19 @@ def clean_old_models(model_dir: str = None, keep_newest: int = config.MAX_MODELS
         
         # Keep the newest N models, delete the rest
         models_to_delete = model_files[keep_newest:]
+        
+        # Delete in one call so backends that support it can batch the requests
+        try:
+            deleted = delete_models(storage, [model['name'] for model in models_to_delete])
+        except Exception as e:
+            logger.error(f"Error deleting old models: {e}")
+            deleted = {}
+        
         for model in models_to_delete:
-            # Delete model
-            try:
-                result = storage.delete_model(model['name'])
-                if result:
-                    logger.info(f"Deleted old model: {model['version']}")
-                else:
-                    logger.warning(f"Failed to delete model: {model['version']}")
-            except Exception as e:
-                logger.error(f"Error deleting model {model['version']}: {e}")
+            if deleted.get(model['name']):
+                logger.info(f"Deleted old model: {model['version']}")
+            else:
+                logger.warning(f"Failed to delete model: {model['version']}")
                 
             # For local storage, also clean up associated files if model_dir provided
             if model_dir:
@@ -366,11 +366,9 @@ def store_uploaded_model(
         try:
             model_name = f"model_upload_{device_id}_{model_id}.mlmodel"
             
-            # If file_path is a local file, read and upload
+            # If file_path is a local file, upload it from disk
             if os.path.exists(file_path):
-                with open(file_path, 'rb') as f:
-                    model_data = f.read()
-                dropbox_metadata = _dropbox_storage.upload_model(model_data, model_name)
+                dropbox_metadata = _dropbox_storage.upload_model(file_path, model_name)
             # If file_path is already a path reference
             elif file_path.startswith('dropbox:') or file_path.startswith('memory:'):
                 # Already uploaded to Dropbox or in memory, no need to upload again
@@ -595,9 +593,7 @@ def store_model_version(
             # Check if path is a string (file path) or file-like object
             if isinstance(path, str) and os.path.exists(path):
                 # Upload file from path
-                with open(path, 'rb') as f:
-                    model_data = f.read()
-                dropbox_metadata = _dropbox_storage.upload_model(model_data, model_name)
+                dropbox_metadata = _dropbox_storage.upload_model(path, model_name)
             else:
                 # Try to upload directly (might be a file-like object)
                 dropbox_metadata = _dropbox_storage.upload_model(path, model_name)
@@ -18,9 +18,14 @@ import json
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Tuple
 
+from utils.storage_factory import StorageInterface
+
 logger = logging.getLogger(__name__)
 
-class DriveStorage:
+# Maximum sub-requests the Drive API accepts in one batch request
+DRIVE_BATCH_SIZE = 100
+
+class DriveStorage(StorageInterface):
     """Handles Google Drive storage operations for the Backdoor AI server."""
     
     def __init__(self, credentials_path: str, db_filename: str = "interactions.db", models_folder_name: str = "backdoor_models"):
@@ -40,6 +45,7 @@ class DriveStorage:
         self.db_file_id = None
         self.models_folder_id = None
         self.model_files = {}  # Mapping of model names to file IDs
+        self.model_metadata = {}  # Mapping of model names to metadata from the last sync
         
         # Local storage paths
         self.temp_dir = tempfile.gettempdir()
@@ -178,8 +184,10 @@ class DriveStorage:
                 'q': f"'{self.models_folder_id}' in parents and mimeType!='application/vnd.google-apps.folder' and trashed=false"
             }).GetList()
             
-            # Update model files map
+            # Update model files map; the listing already carries each file's
+            # metadata, so keep it rather than fetching it again per file
             self.model_files = {file['title']: file['id'] for file in file_list}
+            self.model_metadata = {file['title']: file for file in file_list}
             self.last_models_sync = time.time()
             
             logger.info(f"Synced {len(self.model_files)} model files from Google Drive")
@@ -305,9 +313,10 @@ class DriveStorage:
                 drive_file.SetContentFile(local_path)
                 drive_file.Upload()
                 
-                # Update model files map
+                # Update model files and metadata maps
                 model_id = drive_file['id']
                 self.model_files[model_name] = model_id
+                self.model_metadata[model_name] = drive_file
                 
                 # Get metadata for response
                 result = {
@@ -388,20 +397,27 @@ class DriveStorage:
                 return []
                 
             try:
-                # Get details for each model
+                # Get details for each model from the synced listing
                 models = []
                 for name, file_id in self.model_files.items():
-                    file_info = self.drive.CreateFile({'id': file_id})
-                    file_info.FetchMetadata()
-                    
-                    models.append({
-                        'name': name,
-                        'id': file_id,
-                        'size': int(file_info['fileSize']) if 'fileSize' in file_info else 0,
-                        'created_date': file_info['createdDate'],
-                        'modified_date': file_info['modifiedDate'],
-                        'download_url': file_info['alternateLink']
-                    })
+                    try:
+                        file_info = self.model_metadata.get(name)
+                        if file_info is None:
+                            # Not in the last listing (e.g. the sync failed); fetch it
+                            file_info = self.drive.CreateFile({'id': file_id})
+                            file_info.FetchMetadata()
+                            self.model_metadata[name] = file_info
+                        
+                        models.append({
+                            'name': name,
+                            'id': file_id,
+                            'size': int(file_info['fileSize']) if 'fileSize' in file_info else 0,
+                            'created_date': file_info['createdDate'],
+                            'modified_date': file_info['modifiedDate'],
+                            'download_url': file_info['alternateLink']
+                        })
+                    except Exception as e:
+                        logger.error(f"Error getting metadata for model {name}: {e}")
                 
                 return models
                 
@@ -431,8 +447,9 @@ class DriveStorage:
                 drive_file = self.drive.CreateFile({'id': model_id})
                 drive_file.Delete()
                 
-                # Update model files map
+                # Update model files and metadata maps
                 del self.model_files[model_name]
+                self.model_metadata.pop(model_name, None)
                 
                 logger.info(f"Deleted model {model_name} from Google Drive")
                 return True
@@ -440,6 +457,52 @@ class DriveStorage:
             except Exception as e:
                 logger.error(f"Error deleting model {model_name}: {e}")
                 return False
+    
+    def delete_models(self, model_names: List[str]) -> Dict[str, bool]:
+        """
+        Delete several model files using batched Drive API requests.
+        
+        Args:
+            model_names: Names of the model files to delete
+            
+        Returns:
+            Dict mapping each model name to True if it was deleted
+        """
+        with self.lock:
+            # Each name is also its batch request_id, which must be unique
+            model_names = list(dict.fromkeys(model_names))
+            results = {name: False for name in model_names}
+            if self.drive is None:
+                logger.error("Cannot delete models: Google Drive not initialized")
+                return results
+            
+            pending = []
+            for name in model_names:
+                if name in self.model_files:
+                    pending.append(name)
+                else:
+                    logger.warning(f"Cannot delete: Model {name} not found in Google Drive")
+            
+            service = self.drive.auth.service
+            for start in range(0, len(pending), DRIVE_BATCH_SIZE):
+                def _on_delete(request_id, response, exception):
+                    if exception is not None:
+                        logger.error(f"Error deleting model {request_id}: {exception}")
+                        return
+                    self.model_files.pop(request_id, None)
+                    self.model_metadata.pop(request_id, None)
+                    results[request_id] = True
+                    logger.info(f"Deleted model {request_id} from Google Drive")
+                
+                batch = service.new_batch_http_request(callback=_on_delete)
+                for name in pending[start:start + DRIVE_BATCH_SIZE]:
+                    batch.add(service.files().delete(fileId=self.model_files[name]), request_id=name)
+                try:
+                    batch.execute()
+                except Exception as e:
+                    logger.error(f"Error executing batched model delete: {e}")
+            
+            return results
 
 # Module-level singleton instance
 _drive_storage = None
@@ -9,20 +9,89 @@ This module provides functionality to:
 
 import os
 import io
+import itertools
 import tempfile
 import time
 import threading
 import logging
 import json
+from collections import OrderedDict
 import dropbox
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from dropbox.exceptions import ApiError, AuthError
 from dropbox.files import WriteMode
 from datetime import datetime
-from typing import Dict, Any, Optional, List, Tuple
+from typing import Dict, Any, Optional, List, Tuple, Iterator
+
+from utils.storage_factory import StorageInterface
 
 logger = logging.getLogger(__name__)
 
-class DropboxStorage:
+# Keep-alive connection pool shared by every Dropbox client we create
+HTTP_POOL_SIZE = 20
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def _get_http_session() -> requests.Session:
+    """
+    Get the shared HTTP session used by all Dropbox clients.
+    
+    Reusing one session keeps TLS connections alive across client
+    re-creation (e.g. after a token refresh) and concurrent requests.
+    
+    Returns:
+        requests.Session: Session with a pooled, retrying HTTPS adapter
+    """
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=HTTP_POOL_SIZE,
+                pool_maxsize=HTTP_POOL_SIZE,
+                max_retries=Retry(total=3, backoff_factor=0.3)
+            )
+            session.mount('https://', adapter)
+            _http_session = session
+        return _http_session
+
+# Uploads larger than one chunk go through an upload session, one chunk at a time
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+
+def _iter_chunks(data_or_path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> Iterator[bytes]:
+    """
+    Yield the content of a file path, file-like object or bytes in chunks.
+    
+    Files are read one chunk at a time, so the whole content is never held
+    in memory at once.
+    
+    Args:
+        data_or_path: File path, binary data, or file-like object
+        chunk_size: Maximum size of each chunk in bytes
+        
+    Yields:
+        bytes: The next chunk of content
+    """
+    if isinstance(data_or_path, str):
+        with open(data_or_path, 'rb') as f:
+            yield from iter(lambda: f.read(chunk_size), b'')
+    elif hasattr(data_or_path, 'read'):
+        # Make sure we're at the beginning
+        if hasattr(data_or_path, 'seek'):
+            data_or_path.seek(0)
+        yield from iter(lambda: data_or_path.read(chunk_size), b'')
+    else:
+        view = memoryview(data_or_path)
+        if len(view) <= chunk_size:
+            yield bytes(data_or_path)
+            return
+        for start in range(0, len(view), chunk_size):
+            yield view[start:start + chunk_size].tobytes()
+
+class DropboxStorage(StorageInterface):
     """Handles Dropbox storage operations for the Backdoor AI server."""
     
     def __init__(self, access_token: str = None, refresh_token: str = None, 
@@ -69,6 +138,13 @@ class DropboxStorage:
         self.db_sync_interval = 60  # Seconds
         self.models_sync_interval = 300  # Seconds
         
+        # Short-lived caches for list_models and download_model_to_memory
+        self.list_cache_ttl = 30  # Seconds
+        self.model_cache_bytes = 64 * 1024 * 1024
+        self._models_list_cache = None  # (timestamp, models)
+        self._model_content_cache = OrderedDict()  # path -> (rev, content)
+        self._model_content_cache_size = 0
+        
         # Thread safety
         self.lock = threading.RLock()
         self.auth_lock = threading.RLock()
@@ -80,6 +156,10 @@ class DropboxStorage:
                 self.max_retries = config.DROPBOX_MAX_RETRIES
             if hasattr(config, 'DROPBOX_RETRY_DELAY'):
                 self.retry_delay = config.DROPBOX_RETRY_DELAY
+            if hasattr(config, 'STORAGE_CACHE_TTL'):
+                self.list_cache_ttl = config.STORAGE_CACHE_TTL
+            if hasattr(config, 'STORAGE_MODEL_CACHE_BYTES'):
+                self.model_cache_bytes = config.STORAGE_MODEL_CACHE_BYTES
         except ImportError:
             pass
         
@@ -163,11 +243,12 @@ class DropboxStorage:
                 dbx = dropbox.Dropbox(
                     oauth2_access_token=self.access_token,
                     app_key=self.app_key,
-                    app_secret=self.app_secret
+                    app_secret=self.app_secret,
+                    session=_get_http_session()
                 )
             else:
                 logger.info("Creating Dropbox client with access token only")
-                dbx = dropbox.Dropbox(self.access_token)
+                dbx = dropbox.Dropbox(self.access_token, session=_get_http_session())
                 
             # Verify the token works
             dbx.users_get_current_account()
@@ -206,10 +287,11 @@ class DropboxStorage:
                         dbx = dropbox.Dropbox(
                             oauth2_access_token=self.access_token,
                             app_key=self.app_key,
-                            app_secret=self.app_secret
+                            app_secret=self.app_secret,
+                            session=_get_http_session()
                         )
                     else:
-                        dbx = dropbox.Dropbox(self.access_token)
+                        dbx = dropbox.Dropbox(self.access_token, session=_get_http_session())
                         
                     # Quick check of token validity
                     dbx.users_get_current_account()
@@ -239,10 +321,11 @@ class DropboxStorage:
                                 dbx = dropbox.Dropbox(
                                     oauth2_access_token=token,
                                     app_key=self.app_key,
-                                    app_secret=self.app_secret
+                                    app_secret=self.app_secret,
+                                    session=_get_http_session()
                                 )
                             else:
-                                dbx = dropbox.Dropbox(token)
+                                dbx = dropbox.Dropbox(token, session=_get_http_session())
                             # Test it
                             dbx.users_get_current_account()
                             logger.info("Successfully authenticated with token from file")
@@ -340,7 +423,7 @@ class DropboxStorage:
                 logger.info("Successfully refreshed Dropbox access token")
                 
                 # Initialize Dropbox with the new token
-                dbx = dropbox.Dropbox(self.access_token)
+                dbx = dropbox.Dropbox(self.access_token, session=_get_http_session())
                 # Verify it works
                 dbx.users_get_current_account()
                 self.auth_retries = 0  # Reset retry counter on success
@@ -510,6 +593,60 @@ class DropboxStorage:
             logger.error(f"Error syncing model files: {e}")
             return False
     
+    def _get_cached_content(self, dropbox_path: str, rev: Optional[str]) -> Optional[bytes]:
+        """
+        Get cached model content if it is still the current revision.
+        
+        Args:
+            dropbox_path: Path of the model in Dropbox
+            rev: Current revision reported by Dropbox
+            
+        Returns:
+            Cached bytes, or None if not cached or out of date
+        """
+        entry = self._model_content_cache.get(dropbox_path)
+        if entry is None:
+            return None
+        if rev is None or entry[0] != rev:
+            self._drop_cached_content(dropbox_path)
+            return None
+        self._model_content_cache.move_to_end(dropbox_path)
+        return entry[1]
+    
+    def _cache_content(self, dropbox_path: str, rev: Optional[str], content: bytes) -> None:
+        """
+        Cache downloaded model content, evicting least recently used entries.
+        
+        Args:
+            dropbox_path: Path of the model in Dropbox
+            rev: Revision of the downloaded content
+            content: Downloaded bytes
+        """
+        if rev is None or len(content) > self.model_cache_bytes:
+            return
+        self._drop_cached_content(dropbox_path)
+        self._model_content_cache[dropbox_path] = (rev, content)
+        self._model_content_cache_size += len(content)
+        while self._model_content_cache_size > self.model_cache_bytes:
+            _, (_, evicted) = self._model_content_cache.popitem(last=False)
+            self._model_content_cache_size -= len(evicted)
+    
+    def _drop_cached_content(self, dropbox_path: str) -> None:
+        """Remove a model from the content cache."""
+        entry = self._model_content_cache.pop(dropbox_path, None)
+        if entry is not None:
+            self._model_content_cache_size -= len(entry[1])
+    
+    def _invalidate_model_caches(self, dropbox_path: str) -> None:
+        """
+        Drop cached listing and content after a model changes.
+        
+        Args:
+            dropbox_path: Path of the model that was uploaded or deleted
+        """
+        self._models_list_cache = None
+        self._drop_cached_content(dropbox_path)
+    
     def get_db_path(self) -> str:
         """
         Get the local path to the database file, downloading it from Dropbox if needed.
@@ -652,34 +789,11 @@ class DropboxStorage:
             upload_folder = folder if folder else self.models_folder_name
             
             dropbox_path = f"/{upload_folder}/{model_name}"
-            file_data = None
-            file_size = 0
             
             try:
-                # Determine how to read the data based on the type of data_or_path
-                if isinstance(data_or_path, str):
-                    # It's a file path
-                    if not os.path.exists(data_or_path):
-                        logger.warning(f"Cannot upload model: File not found at {data_or_path}")
-                        return {'success': False, 'error': 'File not found'}
-                    
-                    # Read the file
-                    with open(data_or_path, 'rb') as f:
-                        file_data = f.read()
-                        file_size = len(file_data)
-                
-                elif hasattr(data_or_path, 'read'):
-                    # It's a file-like object (e.g., BytesIO)
-                    # Make sure we're at the beginning
-                    if hasattr(data_or_path, 'seek'):
-                        data_or_path.seek(0)
-                    file_data = data_or_path.read()
-                    file_size = len(file_data)
-                
-                else:
-                    # Assume it's binary data
-                    file_data = data_or_path
-                    file_size = len(file_data)
+                if isinstance(data_or_path, str) and not os.path.exists(data_or_path):
+                    logger.warning(f"Cannot upload model: File not found at {data_or_path}")
+                    return {'success': False, 'error': 'File not found'}
                 
                 # Ensure the folder exists
                 try:
@@ -695,11 +809,11 @@ class DropboxStorage:
                     # Continue anyway - the upload will fail if folder doesn't exist
                 
                 # Upload to Dropbox
-                upload_result = self.dbx.files_upload(file_data, dropbox_path, 
-                                                    mode=WriteMode.overwrite)
+                file_size = self._upload_chunks(_iter_chunks(data_or_path), dropbox_path)
                 
                 # Update model files map
                 self.model_files[model_name] = dropbox_path
+                self._invalidate_model_caches(dropbox_path)
                 
                 # Create shared link for the file
                 shared_link = self.dbx.sharing_create_shared_link_with_settings(dropbox_path)
@@ -724,6 +838,37 @@ class DropboxStorage:
                 logger.error(f"Error uploading model {model_name}: {e}")
                 return {'success': False, 'error': str(e)}
     
+    def _upload_chunks(self, chunks: Iterator[bytes], dropbox_path: str) -> int:
+        """
+        Upload content to Dropbox, overwriting any existing file.
+        
+        Content that fits in one chunk is sent with a single request; larger
+        content is streamed through an upload session.
+        
+        Args:
+            chunks: Iterator over the content in chunks
+            dropbox_path: Destination path in Dropbox
+            
+        Returns:
+            int: Number of bytes uploaded
+        """
+        first = next(chunks, b'')
+        second = next(chunks, None)
+        if second is None:
+            self.dbx.files_upload(first, dropbox_path, mode=WriteMode.overwrite)
+            return len(first)
+        
+        session = self.dbx.files_upload_session_start(first)
+        cursor = dropbox.files.UploadSessionCursor(session_id=session.session_id,
+                                                   offset=len(first))
+        for chunk in itertools.chain((second,), chunks):
+            self.dbx.files_upload_session_append_v2(chunk, cursor)
+            cursor.offset += len(chunk)
+        
+        commit = dropbox.files.CommitInfo(path=dropbox_path, mode=WriteMode.overwrite)
+        self.dbx.files_upload_session_finish(b'', cursor, commit)
+        return cursor.offset
+    
     def get_model_stream(self, model_name: str, folder: str = None) -> Dict[str, Any]:
         """
         Get a streaming download URL for a model file in Dropbox.
@@ -794,7 +939,9 @@ class DropboxStorage:
                     'success': True,
                     'download_url': download_url,
                     'size': metadata.size,
-                    'path': dropbox_path
+                    'path': dropbox_path,
+                    'rev': getattr(metadata, 'rev', None),
+                    'content_hash': getattr(metadata, 'content_hash', None)
                 }
                 
             except Exception as e:
@@ -810,7 +957,7 @@ class DropboxStorage:
             folder: Optional specific folder to look in, defaults to models_folder_name
             
         Returns:
-            Dict with success, model_buffer, size fields
+            Dict with success, model_buffer, size and content_hash fields
         """
         with self.lock:
             # Sync model files if needed
@@ -831,16 +978,31 @@ class DropboxStorage:
             try:
                 # Check if the file exists
                 try:
-                    self.dbx.files_get_metadata(dropbox_path)
+                    metadata = self.dbx.files_get_metadata(dropbox_path)
                 except Exception:
                     logger.warning(f"Model {model_name} not found at {dropbox_path}")
+                    self._drop_cached_content(dropbox_path)
                     return {'success': False, 'error': 'Model not found'}
                 
+                # Reuse content we already downloaded if the revision is unchanged
+                rev = getattr(metadata, 'rev', None)
+                content = self._get_cached_content(dropbox_path, rev)
+                if content is not None:
+                    logger.info(f"Using cached content for model {model_name} (rev {rev})")
+                    return {
+                        'success': True,
+                        'model_buffer': io.BytesIO(content),
+                        'size': len(content),
+                        'path': dropbox_path,
+                        'content_hash': getattr(metadata, 'content_hash', None)
+                    }
+                
                 # Download file to memory
                 result = self.dbx.files_download(dropbox_path)
                 
                 # Get content and create buffer
                 content = result[1].content
+                self._cache_content(dropbox_path, rev, content)
                 buffer = io.BytesIO(content)
                 buffer.seek(0)
                 
@@ -850,7 +1012,8 @@ class DropboxStorage:
                     'success': True,
                     'model_buffer': buffer,
                     'size': len(content),
-                    'path': dropbox_path
+                    'path': dropbox_path,
+                    'content_hash': getattr(result[0], 'content_hash', None)
                 }
                 
             except Exception as e:
@@ -911,6 +1074,11 @@ class DropboxStorage:
             List of model information dictionaries
         """
         with self.lock:
+            # Reuse a recent listing instead of querying Dropbox again
+            cached = self._models_list_cache
+            if cached is not None and time.time() - cached[0] < self.list_cache_ttl:
+                return [dict(model) for model in cached[1]]
+            
             # Sync model files
             self._sync_model_files()
             
@@ -936,7 +1104,8 @@ class DropboxStorage:
                     except Exception as e:
                         logger.error(f"Error getting metadata for model {name}: {e}")
                 
-                return models
+                self._models_list_cache = (time.time(), models)
+                return [dict(model) for model in models]
                 
             except Exception as e:
                 logger.error(f"Error listing models: {e}")
@@ -965,6 +1134,7 @@ class DropboxStorage:
                 
                 # Update model files map
                 del self.model_files[model_name]
+                self._invalidate_model_caches(dropbox_path)
                 
                 logger.info(f"Deleted model {model_name} from Dropbox")
                 return True
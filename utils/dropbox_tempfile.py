@@ -5,17 +5,236 @@ This module provides utilities for creating and managing temporary files
 that are synced with Dropbox, ensuring data persistence across deployments.
 """
 
+import functools
 import io
+import itertools
+import mmap
 import os
 import tempfile
-import uuid
+import threading
+import time
 import logging
 from typing import Optional, Dict, Any, BinaryIO, Union
 
+import dropbox
 import config
 
 logger = logging.getLogger(__name__)
 
+# Cache of temp file download URLs, keyed by (filename, folder)
+_url_cache = {}
+_url_cache_timestamps = {}
+_url_cache_lock = threading.RLock()
+_URL_CACHE_TTL = 3600  # 1 hour
+_URL_CACHE_MAX_SIZE = 1024
+
+# Buffered bytes are streamed to a Dropbox upload session once they reach this size
+UPLOAD_CHUNK_SIZE = 4 * 1024 * 1024
+
+# Dropbox's limit on the total size of a file uploaded through a session
+MAX_SESSION_UPLOAD_SIZE = 350 * 1024 ** 3
+
+# Per-process counter that keeps temp file names unique without os.urandom
+_name_counter = itertools.count()
+
+def _unique_id() -> str:
+    """Build a unique, non-cryptographic ID from the clock, PID and a counter."""
+    return f"{time.time_ns():x}{os.getpid():x}{next(_name_counter):x}"
+
+@functools.lru_cache(maxsize=1)
+def _get_storage_accessor():
+    """Import get_dropbox_storage on first use (avoids a circular import)."""
+    from utils.dropbox_storage import get_dropbox_storage
+    return get_dropbox_storage
+
+def _get_storage():
+    """Return the current Dropbox storage singleton."""
+    return _get_storage_accessor()()
+
+class _LocalFileBackend:
+    """Temp file storage on local disk, uploaded to Dropbox when finalized."""
+    
+    def __init__(self, temp_file, filename: str, folder: str):
+        self.temp_file = temp_file
+        self.filename = filename
+        self.folder = folder
+        
+        # Bound methods of the underlying file, resolved once
+        self.write = temp_file.write
+        self.read = temp_file.read
+        self.seek = temp_file.seek
+        self.tell = temp_file.tell
+        self.flush = temp_file.flush
+    
+    def finalize(self) -> bool:
+        """
+        Close the local file and upload it to Dropbox if enabled.
+        
+        Returns:
+            bool: True if the file was uploaded
+        """
+        # First flush and close the local file
+        self.temp_file.flush()
+        self.temp_file.close()
+        
+        # Try to upload to Dropbox if it's enabled
+        if not hasattr(config, 'DROPBOX_ENABLED') or not config.DROPBOX_ENABLED:
+            return False
+            
+        try:
+            dropbox_storage = _get_storage()
+            
+            # Upload the local file to Dropbox
+            with open(self.temp_file.name, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                
+                if size > UPLOAD_CHUNK_SIZE:
+                    # Map the file instead of reading it into memory and send
+                    # it through an upload session one chunk at a time
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                        # The file is read front to back exactly once, so ask
+                        # the kernel for aggressive readahead where supported
+                        if hasattr(mapped, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                            mapped.madvise(mmap.MADV_SEQUENTIAL)
+                        self._upload_mapped(dropbox_storage.dbx, mapped, size)
+                    return True
+                    
+                data = f.read()
+                result = dropbox_storage.upload_model(
+                    data, 
+                    self.filename, 
+                    self.folder
+                )
+                
+                if result and result.get('success'):
+                    return True
+                logger.warning(f"Failed to upload temp file to Dropbox: {result.get('error', 'Unknown error')}")
+        except Exception as e:
+            logger.error(f"Error uploading temp file to Dropbox: {e}")
+        
+        return False
+    
+    def _upload_mapped(self, dbx, mapped: mmap.mmap, size: int) -> None:
+        """
+        Upload a memory-mapped file through a Dropbox upload session.
+        
+        Only one UPLOAD_CHUNK_SIZE slice is copied out of the mapping at a time.
+        
+        Args:
+            dbx: Authenticated Dropbox client
+            mapped: Read-only mapping of the local temp file
+            size: Size of the file in bytes
+        """
+        if size > MAX_SESSION_UPLOAD_SIZE:
+            raise ValueError(f"Temp file exceeds the {MAX_SESSION_UPLOAD_SIZE} byte Dropbox upload limit")
+            
+        offset = UPLOAD_CHUNK_SIZE
+        session_id = dbx.files_upload_session_start(mapped[:offset]).session_id
+        
+        while size - offset > UPLOAD_CHUNK_SIZE:
+            cursor = dropbox.files.UploadSessionCursor(session_id, offset)
+            dbx.files_upload_session_append_v2(mapped[offset:offset + UPLOAD_CHUNK_SIZE], cursor)
+            offset += UPLOAD_CHUNK_SIZE
+            
+        cursor = dropbox.files.UploadSessionCursor(session_id, offset)
+        commit = dropbox.files.CommitInfo(
+            path=f"/{self.folder}/{self.filename}",
+            mode=dropbox.files.WriteMode.overwrite
+        )
+        dbx.files_upload_session_finish(mapped[offset:size], cursor, commit)
+
+class _BufferBackend:
+    """In-memory temp file storage streamed to a Dropbox upload session."""
+    
+    def __init__(self, dropbox_storage, filename: str, folder: str):
+        self.dropbox_storage = dropbox_storage
+        self.filename = filename
+        self.folder = folder
+        self.buffer = io.BytesIO()
+        
+        # Upload session state for streaming the buffer to Dropbox
+        self._session_id = None
+        self._session_offset = 0
+        self._chunk_threshold = UPLOAD_CHUNK_SIZE
+    
+    def write(self, data: bytes) -> int:
+        """Write to the buffer, streaming it to Dropbox once it is large enough."""
+        written = self.buffer.write(data)
+        if self.buffer.tell() >= self._chunk_threshold:
+            self._stream_chunk()
+        return written
+    
+    def read(self, size: Optional[int] = None) -> bytes:
+        if self._session_id is not None:
+            raise io.UnsupportedOperation("Data already streamed to Dropbox cannot be read back")
+        return self.buffer.read(size)
+    
+    def seek(self, offset: int, whence: int = 0) -> int:
+        if self._session_id is not None:
+            raise io.UnsupportedOperation("Cannot seek after data has been streamed to Dropbox")
+        return self.buffer.seek(offset, whence)
+    
+    def tell(self) -> int:
+        return self._session_offset + self.buffer.tell()
+    
+    def flush(self) -> None:
+        # Nothing to do for BytesIO buffer
+        pass
+    
+    def _stream_chunk(self) -> None:
+        """Send the buffered bytes to the Dropbox upload session and reset the buffer."""
+        chunk = self.buffer.getvalue()
+        if self._session_offset + len(chunk) > MAX_SESSION_UPLOAD_SIZE:
+            raise ValueError(f"Temp file exceeds the {MAX_SESSION_UPLOAD_SIZE} byte Dropbox upload limit")
+            
+        dbx = self.dropbox_storage.dbx
+        
+        if self._session_id is None:
+            result = dbx.files_upload_session_start(chunk)
+            self._session_id = result.session_id
+        else:
+            cursor = dropbox.files.UploadSessionCursor(self._session_id, self._session_offset)
+            dbx.files_upload_session_append_v2(chunk, cursor)
+            
+        self._session_offset += len(chunk)
+        self.buffer = io.BytesIO()
+    
+    def _finish_session(self) -> None:
+        """Commit the remaining buffered bytes and finish the upload session."""
+        cursor = dropbox.files.UploadSessionCursor(self._session_id, self._session_offset)
+        commit = dropbox.files.CommitInfo(
+            path=f"/{self.folder}/{self.filename}",
+            mode=dropbox.files.WriteMode.overwrite
+        )
+        self.dropbox_storage.dbx.files_upload_session_finish(self.buffer.getvalue(), cursor, commit)
+    
+    def finalize(self) -> bool:
+        """
+        Upload whatever is left in the buffer to Dropbox.
+        
+        Returns:
+            bool: True if the file was uploaded
+        """
+        try:
+            if self._session_id is not None:
+                self._finish_session()
+                return True
+                
+            self.buffer.seek(0)
+            result = self.dropbox_storage.upload_model(
+                self.buffer, 
+                self.filename, 
+                self.folder
+            )
+            
+            if result and result.get('success'):
+                return True
+            logger.warning(f"Failed to upload temp file to Dropbox: {result.get('error', 'Unknown error')}")
+        except Exception as e:
+            logger.error(f"Error uploading temp file to Dropbox: {e}")
+        
+        return False
+
 class DropboxTempFile:
     """A temporary file that syncs with Dropbox storage."""
     
@@ -31,15 +250,21 @@ class DropboxTempFile:
         self.prefix = prefix
         self.suffix = suffix
         self.folder = folder
-        self.filename = f"{prefix}_{uuid.uuid4().hex}{suffix}"
+        self.filename = f"{prefix}_{_unique_id()}{suffix}"
         self.dropbox_path = f"{folder}/{self.filename}"
-        self.buffer = io.BytesIO()
         self.closed = False
         self.uploaded = False
         self._local_temp_file = None
         
         # Initialize Dropbox if enabled
         self._init_dropbox()
+        
+        # Pick the storage backend once; every I/O method delegates to it
+        if self._local_temp_file:
+            self._backend = _LocalFileBackend(self._local_temp_file, self.filename, self.folder)
+        else:
+            self._backend = _BufferBackend(self.dropbox_storage, self.filename, self.folder)
+        self._write_bytes = self._backend.write
     
     def _init_dropbox(self):
         """Initialize Dropbox connectivity."""
@@ -53,9 +278,7 @@ class DropboxTempFile:
             return
             
         try:
-            # Import here to avoid circular imports
-            from utils.dropbox_storage import get_dropbox_storage
-            self.dropbox_storage = get_dropbox_storage()
+            self.dropbox_storage = _get_storage()
             
             # Ensure temp folder exists
             try:
@@ -98,12 +321,12 @@ class DropboxTempFile:
             raise ValueError("I/O operation on closed file")
             
         if isinstance(data, str):
-            data = data.encode('utf-8')
-            
-        if self._local_temp_file:
-            return self._local_temp_file.write(data)
-        else:
-            return self.buffer.write(data)
+            return self._write_str(data)
+        return self._write_bytes(data)
+    
+    def _write_str(self, data: str) -> int:
+        """Encode a string as UTF-8 and write it."""
+        return self._write_bytes(data.encode('utf-8'))
     
     def read(self, size: Optional[int] = None) -> bytes:
         """
@@ -118,13 +341,7 @@ class DropboxTempFile:
         if self.closed:
             raise ValueError("I/O operation on closed file")
             
-        if self._local_temp_file:
-            return self._local_temp_file.read(size)
-        else:
-            if size is not None:
-                return self.buffer.read(size)
-            else:
-                return self.buffer.read()
+        return self._backend.read(size)
     
     def seek(self, offset: int, whence: int = 0) -> int:
         """
@@ -140,10 +357,7 @@ class DropboxTempFile:
         if self.closed:
             raise ValueError("I/O operation on closed file")
             
-        if self._local_temp_file:
-            return self._local_temp_file.seek(offset, whence)
-        else:
-            return self.buffer.seek(offset, whence)
+        return self._backend.seek(offset, whence)
     
     def tell(self) -> int:
         """
@@ -155,70 +369,23 @@ class DropboxTempFile:
         if self.closed:
             raise ValueError("I/O operation on closed file")
             
-        if self._local_temp_file:
-            return self._local_temp_file.tell()
-        else:
-            return self.buffer.tell()
+        return self._backend.tell()
     
     def flush(self) -> None:
         """Flush the write buffers."""
         if self.closed:
             raise ValueError("I/O operation on closed file")
             
-        if self._local_temp_file:
-            self._local_temp_file.flush()
-        # Nothing to do for BytesIO buffer
+        self._backend.flush()
     
     def close(self) -> None:
         """Close the file and upload to Dropbox if not already done."""
         if self.closed:
             return
             
-        if self._local_temp_file:
-            # First flush and close the local file
-            self._local_temp_file.flush()
-            self._local_temp_file.close()
-            
-            # Try to upload to Dropbox if it's enabled
-            if hasattr(config, 'DROPBOX_ENABLED') and config.DROPBOX_ENABLED:
-                try:
-                    from utils.dropbox_storage import get_dropbox_storage
-                    dropbox_storage = get_dropbox_storage()
-                    
-                    # Upload the local file to Dropbox
-                    with open(self._local_temp_file.name, 'rb') as f:
-                        data = f.read()
-                        result = dropbox_storage.upload_model(
-                            data, 
-                            self.filename, 
-                            self.folder
-                        )
-                        
-                        if result and result.get('success'):
-                            logger.info(f"Uploaded temp file to Dropbox: {self.dropbox_path}")
-                            self.uploaded = True
-                        else:
-                            logger.warning(f"Failed to upload temp file to Dropbox: {result.get('error', 'Unknown error')}")
-                except Exception as e:
-                    logger.error(f"Error uploading temp file to Dropbox: {e}")
-        else:
-            # Upload the buffer to Dropbox
-            try:
-                if hasattr(self, 'dropbox_storage'):
-                    self.buffer.seek(0)
-                    result = self.dropbox_storage.upload_model(
-                        self.buffer, 
-                        self.filename, 
-                        self.folder
-                    )
-                    
-                    if result and result.get('success'):
-                        logger.info(f"Uploaded temp file to Dropbox: {self.dropbox_path}")
-                        self.uploaded = True
-                    else:
-                        logger.warning(f"Failed to upload temp file to Dropbox: {result.get('error', 'Unknown error')}")
-            except Exception as e:
-                logger.error(f"Error uploading temp file to Dropbox: {e}")
+        if self._backend.finalize():
+            logger.info(f"Uploaded temp file to Dropbox: {self.dropbox_path}")
+            self.uploaded = True
         
         self.closed = True
     
@@ -280,6 +447,9 @@ def get_temp_file_url(filename: str, folder: str = "temp_files") -> Optional[str
     """
     Get a direct download URL for a temp file in Dropbox.
     
+    URLs are cached for an hour, well within the lifetime of a Dropbox
+    shared link, so repeated lookups don't hit the Dropbox API.
+    
     Args:
         filename: Name of the file
         folder: Folder in Dropbox where the file is stored
@@ -290,9 +460,39 @@ def get_temp_file_url(filename: str, folder: str = "temp_files") -> Optional[str
     if not hasattr(config, 'DROPBOX_ENABLED') or not config.DROPBOX_ENABLED:
         return None
         
+    key = (filename, folder)
+    with _url_cache_lock:
+        if key in _url_cache:
+            if time.time() - _url_cache_timestamps.get(key, 0) < _URL_CACHE_TTL:
+                return _url_cache[key]
+    
+    url = _fetch_temp_file_url(filename, folder)
+    
+    # Only successful lookups are cached
+    if url:
+        with _url_cache_lock:
+            if key not in _url_cache and len(_url_cache) >= _URL_CACHE_MAX_SIZE:
+                oldest = min(_url_cache_timestamps, key=_url_cache_timestamps.get)
+                _url_cache.pop(oldest, None)
+                _url_cache_timestamps.pop(oldest, None)
+            _url_cache[key] = url
+            _url_cache_timestamps[key] = time.time()
+    
+    return url
+
+def _fetch_temp_file_url(filename: str, folder: str) -> Optional[str]:
+    """
+    Look up a direct download URL for a temp file from Dropbox.
+    
+    Args:
+        filename: Name of the file
+        folder: Folder in Dropbox where the file is stored
+        
+    Returns:
+        Optional[str]: URL or None if unavailable
+    """
     try:
-        from utils.dropbox_storage import get_dropbox_storage
-        dropbox_storage = get_dropbox_storage()
+        dropbox_storage = _get_storage()
         
         model_info = dropbox_storage.get_model_stream(filename, folder=folder)
         if model_info and model_info.get('success'):
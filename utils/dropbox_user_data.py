@@ -5,19 +5,109 @@ This module provides functions for storing and retrieving user interaction
 data in Dropbox, ensuring all user data is preserved across deployments.
 """
 
+import asyncio
+import atexit
+import functools
+import gzip
 import io
 import json
 import logging
 import os
-import time
+import threading
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime
 from typing import Dict, List, Any, Optional
 
 import dropbox
 import config
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
+# Concurrent files_download requests used when the zip download isn't viable
+DOWNLOAD_WORKERS = 20
+
+# Worker threads used by the async wrappers to keep Dropbox I/O off the event loop
+_async_io_pool = ThreadPoolExecutor(max_workers=DOWNLOAD_WORKERS, thread_name_prefix="dropbox-user-data")
+
+# Fixed part of the metadata attached to every stored interaction file
+_STORAGE_META = {
+    'source': 'api_upload',
+    'storage_version': '1.0'
+}
+
+# Interaction files are stored gzip-compressed; plain .json files from older
+# deployments are still read
+USER_DATA_SUFFIXES = ('.json', '.json.gz')
+GZIP_LEVEL = 3
+
+# Interaction uploads are committed together with
+# files_upload_session_finish_batch_v2, once the batch is full or after a delay
+UPLOAD_BATCH_SIZE = 100
+UPLOAD_BATCH_INTERVAL = 5  # seconds
+FINISH_BATCH_LIMIT = 1000  # Dropbox's maximum entries per finish_batch call
+MAX_UPLOAD_SIZE = 140 * 1024 * 1024  # Margin under Dropbox's 150 MB request cap
+MAX_COMMIT_ATTEMPTS = 3  # Commits of one upload before it is given up as lost
+_pending_uploads: List[Any] = []
+_commit_attempts: Dict[str, int] = {}  # Failed commits so far, by session ID
+_pending_uploads_lock = threading.Lock()
+_upload_flush_timer: Optional[threading.Timer] = None
+
+# Cached user_data listing keyed by lower-cased path, plus the list_folder
+# cursor used to fetch only the changes since the last listing
+_user_data_file_cache: Dict[str, Dict[str, Any]] = {}
+_user_data_cursor: Optional[str] = None
+_user_data_list_lock = threading.Lock()
+
+@functools.lru_cache(maxsize=1)
+def _get_storage_accessor():
+    """Resolve get_dropbox_storage once; imported lazily to avoid circular imports."""
+    from utils.dropbox_storage import get_dropbox_storage
+    return get_dropbox_storage
+
+def _get_storage():
+    """
+    Get the Dropbox storage instance.
+    
+    Only the import is cached - the instance itself is looked up on every
+    call because init_dropbox_storage() may replace it after re-authentication.
+    """
+    return _get_storage_accessor()()
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize data to compact UTF-8 JSON bytes.
+    
+    Uses orjson when it is installed, otherwise the standard library.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _loads_user_data(name: str, content: bytes) -> Dict[str, Any]:
+    """
+    Parse a user data file, decompressing it first if it is gzipped.
+    
+    Args:
+        name: File name or path, used to detect the .gz suffix
+        content: Raw file contents
+        
+    Returns:
+        Parsed JSON data
+    """
+    if name.lower().endswith('.gz'):
+        content = gzip.decompress(content)
+        
+    # Both parsers accept UTF-8 bytes directly, no decode step needed
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
 def ensure_user_data_folder() -> bool:
     """
     Ensure the user_data folder exists in Dropbox.
@@ -30,8 +120,7 @@ def ensure_user_data_folder() -> bool:
         return False
         
     try:
-        from utils.dropbox_storage import get_dropbox_storage
-        dropbox_storage = get_dropbox_storage()
+        dropbox_storage = _get_storage()
         
         # Check if folder exists
         user_data_folder = "user_data"
@@ -57,11 +146,15 @@ def store_interactions_to_dropbox(data: Dict[str, Any]) -> bool:
     """
     Store interaction data from devices to Dropbox user_data folder.
     
+    The data is uploaded straight away, but the file is only committed
+    with the next batch (see _queue_upload_commit). Failed commits are
+    retried up to MAX_COMMIT_ATTEMPTS times.
+    
     Args:
         data: Dictionary containing device info and interactions
         
     Returns:
-        bool: True if successfully stored
+        bool: True if the data was uploaded and queued for commit
     """
     if not config.DROPBOX_ENABLED:
         logger.warning("Dropbox not enabled - cannot store user data")
@@ -73,8 +166,7 @@ def store_interactions_to_dropbox(data: Dict[str, Any]) -> bool:
             logger.error("Failed to ensure user_data folder exists")
             return False
             
-        from utils.dropbox_storage import get_dropbox_storage
-        dropbox_storage = get_dropbox_storage()
+        dropbox_storage = _get_storage()
         
         # Extract device ID from data
         device_id = data.get('deviceId', 'unknown')
@@ -98,84 +190,219 @@ def store_interactions_to_dropbox(data: Dict[str, Any]) -> bool:
             device_folder = "user_data"
             
         # Generate a unique filename based on timestamp
-        timestamp = int(time.time())
-        filename = f"interactions_{device_id}_{timestamp}.json"
+        now = datetime.now()
+        timestamp = int(now.timestamp())
+        filename = f"interactions_{device_id}_{timestamp}.json.gz"
         
         # Add metadata to help with analysis
         enriched_data = data.copy()
-        enriched_data['_meta'] = {
-            'stored_date': datetime.now().isoformat(),
-            'source': 'api_upload',
-            'storage_version': '1.0'
-        }
+        enriched_data['_meta'] = {'stored_date': now.isoformat(), **_STORAGE_META}
         
-        # Convert to JSON and save
-        json_data = json.dumps(enriched_data, indent=2)
-        buffer = io.BytesIO(json_data.encode('utf-8'))
+        # Convert to compact JSON and compress - the upload is network-bound
+        payload = gzip.compress(_dumps(enriched_data), compresslevel=GZIP_LEVEL)
         
-        # Upload to Dropbox
+        # Dropbox rejects single requests over 150 MB - fail before sending
+        if len(payload) > MAX_UPLOAD_SIZE:
+            logger.warning(f"Interaction payload for device {device_id} is {len(payload)} bytes, "
+                           f"over the {MAX_UPLOAD_SIZE} byte upload limit - not storing")
+            return False
+        
+        # Upload to Dropbox in a closed single-shot session; the commit is
+        # batched with other pending uploads
         dropbox_path = f"/{device_folder}/{filename}"
-        upload_result = dropbox_storage.dbx.files_upload(
-            buffer.getvalue(), 
-            dropbox_path, 
-            mode=dropbox.files.WriteMode.overwrite
-        )
+        session = dropbox_storage.dbx.files_upload_session_start(payload, close=True)
+        _queue_upload_commit(session.session_id, len(payload), dropbox_path)
         
-        logger.info(f"Stored interactions to Dropbox: {dropbox_path}")
+        logger.info(f"Uploaded interactions to Dropbox, queued for commit: {dropbox_path}")
         return True
         
     except Exception as e:
         logger.error(f"Error storing interactions to Dropbox: {e}")
         return False
 
+def _queue_upload_commit(session_id: str, size: int, dropbox_path: str) -> None:
+    """
+    Queue a closed upload session to be committed in the next batch.
+    
+    The batch is committed immediately once it reaches UPLOAD_BATCH_SIZE,
+    otherwise a timer commits it after UPLOAD_BATCH_INTERVAL seconds.
+    
+    Args:
+        session_id: ID of the closed upload session
+        size: Number of bytes uploaded in the session
+        dropbox_path: Destination path of the file
+    """
+    global _upload_flush_timer
+    
+    entry = dropbox.files.UploadSessionFinishArg(
+        dropbox.files.UploadSessionCursor(session_id, size),
+        dropbox.files.CommitInfo(path=dropbox_path, mode=dropbox.files.WriteMode.overwrite)
+    )
+    
+    batch = None
+    with _pending_uploads_lock:
+        _pending_uploads.append(entry)
+        if len(_pending_uploads) >= UPLOAD_BATCH_SIZE:
+            batch = _take_pending_uploads()
+        else:
+            _schedule_flush()
+            
+    if batch:
+        _commit_upload_batch(batch)
+
+def _schedule_flush() -> None:
+    """Start the batch flush timer if it isn't running. Caller must hold _pending_uploads_lock."""
+    global _upload_flush_timer
+    
+    if _upload_flush_timer is None:
+        _upload_flush_timer = threading.Timer(UPLOAD_BATCH_INTERVAL, flush_pending_uploads)
+        _upload_flush_timer.daemon = True
+        _upload_flush_timer.start()
+
+def _requeue_uploads(entries: List[Any]) -> None:
+    """
+    Queue failed commits for another attempt with the next batch.
+    
+    Entries that have already failed MAX_COMMIT_ATTEMPTS times are dropped
+    and logged as lost.
+    
+    Args:
+        entries: UploadSessionFinishArg entries whose commit failed
+    """
+    with _pending_uploads_lock:
+        for entry in entries:
+            session_id = entry.cursor.session_id
+            attempts = _commit_attempts.get(session_id, 0) + 1
+            if attempts >= MAX_COMMIT_ATTEMPTS:
+                _commit_attempts.pop(session_id, None)
+                logger.error(f"Giving up on user data file {entry.commit.path} "
+                             f"after {attempts} failed commits - data lost")
+            else:
+                _commit_attempts[session_id] = attempts
+                _pending_uploads.append(entry)
+        if _pending_uploads:
+            _schedule_flush()
+
+def _take_pending_uploads() -> List[Any]:
+    """Remove and return all queued commits. Caller must hold _pending_uploads_lock."""
+    global _upload_flush_timer
+    
+    if _upload_flush_timer is not None:
+        _upload_flush_timer.cancel()
+        _upload_flush_timer = None
+        
+    batch = list(_pending_uploads)
+    _pending_uploads.clear()
+    return batch
+
+def _commit_upload_batch(batch: List[Any]) -> None:
+    """
+    Commit a batch of closed upload sessions with a single finish_batch call.
+    
+    Entries that fail to commit are requeued for a later attempt.
+    
+    Args:
+        batch: UploadSessionFinishArg entries to commit
+    """
+    failed = []
+    committed = []
+    for start in range(0, len(batch), FINISH_BATCH_LIMIT):
+        entries = batch[start:start + FINISH_BATCH_LIMIT]
+        try:
+            dropbox_storage = _get_storage()
+            result = dropbox_storage.dbx.files_upload_session_finish_batch_v2(entries)
+        except Exception as e:
+            logger.error(f"Error committing {len(entries)} user data uploads to Dropbox: {e}")
+            failed.extend(entries)
+            continue
+        
+        for entry, outcome in zip(entries, result.entries):
+            if outcome.is_failure():
+                logger.error(f"Error committing user data file {entry.commit.path}: {outcome.get_failure()}")
+                failed.append(entry)
+            else:
+                committed.append(entry)
+    
+    if committed:
+        with _pending_uploads_lock:
+            for entry in committed:
+                _commit_attempts.pop(entry.cursor.session_id, None)
+        logger.info(f"Committed {len(committed)} user data uploads to Dropbox")
+    if failed:
+        _requeue_uploads(failed)
+
+def flush_pending_uploads() -> None:
+    """Commit all queued interaction uploads now."""
+    with _pending_uploads_lock:
+        batch = _take_pending_uploads()
+        
+    if batch:
+        _commit_upload_batch(batch)
+
+def _flush_at_exit() -> None:
+    """Commit everything still queued, retrying failures before the process exits."""
+    for _ in range(MAX_COMMIT_ATTEMPTS):
+        with _pending_uploads_lock:
+            batch = _take_pending_uploads()
+        if not batch:
+            return
+        _commit_upload_batch(batch)
+
+# Commit anything still queued when the process exits
+atexit.register(_flush_at_exit)
+
 def list_user_data_files() -> List[Dict[str, Any]]:
     """
     List all user data files in the user_data folder.
     
+    The first call enumerates the whole folder; later calls resume from the
+    saved list_folder cursor so only new, changed or deleted entries are
+    fetched and merged into the cached listing.
+    
     Returns:
         List of dictionaries with file information
     """
+    global _user_data_cursor
+    
     if not config.DROPBOX_ENABLED:
         logger.warning("Dropbox not enabled - cannot list user data")
         return []
         
     try:
-        from utils.dropbox_storage import get_dropbox_storage
-        dropbox_storage = get_dropbox_storage()
-        
-        # Ensure user_data folder exists
-        ensure_user_data_folder()
-        
-        user_data_files = []
+        dropbox_storage = _get_storage()
         
-        # List files in user_data folder
-        try:
-            result = dropbox_storage.dbx.files_list_folder("/user_data", recursive=True)
-            
-            # Process files
-            for entry in result.entries:
-                if isinstance(entry, dropbox.files.FileMetadata) and entry.path_lower.endswith('.json'):
-                    user_data_files.append({
-                        'path': entry.path_display,
-                        'name': entry.name,
-                        'size': entry.size,
-                        'modified': entry.server_modified.isoformat()
-                    })
-                    
-            # Continue listing if there are more files
-            while result.has_more:
-                result = dropbox_storage.dbx.files_list_folder_continue(result.cursor)
-                for entry in result.entries:
-                    if isinstance(entry, dropbox.files.FileMetadata) and entry.path_lower.endswith('.json'):
-                        user_data_files.append({
-                            'path': entry.path_display,
-                            'name': entry.name,
-                            'size': entry.size,
-                            'modified': entry.server_modified.isoformat()
-                        })
+        with _user_data_list_lock:
+            # List files in user_data folder
+            try:
+                result = None
+                if _user_data_cursor:
+                    try:
+                        # Fetch only the changes since the last listing
+                        result = dropbox_storage.dbx.files_list_folder_continue(_user_data_cursor)
+                    except Exception as e:
+                        logger.info(f"Saved user data cursor is no longer valid, relisting: {e}")
                         
-        except Exception as e:
-            logger.error(f"Error listing user data files: {e}")
+                if result is None:
+                    # Ensure user_data folder exists
+                    ensure_user_data_folder()
+                    
+                    _user_data_file_cache.clear()
+                    result = dropbox_storage.dbx.files_list_folder("/user_data", recursive=True)
+                    
+                _apply_list_entries(result.entries)
+                
+                # Continue listing if there are more files
+                while result.has_more:
+                    result = dropbox_storage.dbx.files_list_folder_continue(result.cursor)
+                    _apply_list_entries(result.entries)
+                    
+                _user_data_cursor = result.cursor
+                    
+            except Exception as e:
+                logger.error(f"Error listing user data files: {e}")
+                _user_data_cursor = None
+                
+            user_data_files = list(_user_data_file_cache.values())
             
         logger.info(f"Found {len(user_data_files)} user data files in Dropbox")
         return user_data_files
@@ -184,6 +411,34 @@ def list_user_data_files() -> List[Dict[str, Any]]:
         logger.error(f"Error listing user data files: {e}")
         return []
 
+def _apply_list_entries(entries) -> None:
+    """
+    Merge a page of list_folder entries into the cached user data listing.
+    
+    Args:
+        entries: Metadata entries returned by files_list_folder(_continue)
+    """
+    # Each path appears at most once per page, so removals can be applied
+    # before the additions
+    for entry in entries:
+        if isinstance(entry, dropbox.files.DeletedMetadata):
+            # A deleted path may be a file or a whole device folder
+            _user_data_file_cache.pop(entry.path_lower, None)
+            prefix = entry.path_lower.rstrip('/') + '/'
+            for path in [p for p in _user_data_file_cache if p.startswith(prefix)]:
+                del _user_data_file_cache[path]
+                
+    _user_data_file_cache.update({
+        e.path_lower: {
+            'path': e.path_display,
+            'name': e.name,
+            'size': e.size,
+            'modified': e.server_modified.isoformat()
+        }
+        for e in entries
+        if isinstance(e, dropbox.files.FileMetadata) and e.path_lower.endswith(USER_DATA_SUFFIXES)
+    })
+
 def load_user_data_for_training() -> List[Dict[str, Any]]:
     """
     Load all user data files for training.
@@ -196,34 +451,130 @@ def load_user_data_for_training() -> List[Dict[str, Any]]:
         return []
         
     try:
-        from utils.dropbox_storage import get_dropbox_storage
-        dropbox_storage = get_dropbox_storage()
+        dropbox_storage = _get_storage()
         
-        # Get list of user data files
-        user_data_files = list_user_data_files()
+        # Make sure queued uploads are visible before reading the folder
+        flush_pending_uploads()
+        
+        # Fetch the whole folder as a single zip archive - one round-trip
+        # instead of one files_download request per JSON file
+        try:
+            all_interactions = _load_interactions_from_zip(dropbox_storage.dbx)
+        except Exception as e:
+            logger.warning(f"Zip download of user data failed, falling back to per-file download: {e}")
+            all_interactions = _load_interactions_per_file(dropbox_storage.dbx)
+                
+        logger.info(f"Loaded {len(all_interactions)} interactions from user data files")
+        return all_interactions
+        
+    except Exception as e:
+        logger.error(f"Error loading user data for training: {e}")
+        return []
+
+def _load_interactions_from_zip(dbx) -> List[Dict[str, Any]]:
+    """
+    Download the user_data folder as a zip archive and extract interactions.
+    
+    Args:
+        dbx: Authenticated Dropbox client
         
-        # Load all interaction data
-        all_interactions = []
+    Returns:
+        List of interaction dictionaries
         
-        for file_info in user_data_files:
+    Raises:
+        Exception: If the folder cannot be downloaded as a zip (e.g. too large)
+    """
+    _, response = dbx.files_download_zip("/user_data")
+    
+    all_interactions = []
+    with zipfile.ZipFile(io.BytesIO(response.content)) as archive:
+        for name in archive.namelist():
+            if not name.lower().endswith(USER_DATA_SUFFIXES):
+                continue
             try:
-                # Download file
-                result = dropbox_storage.dbx.files_download(file_info['path'])
-                
-                # Parse JSON
-                content = result[1].content
-                data = json.loads(content.decode('utf-8'))
+                data = _loads_user_data(name, archive.read(name))
                 
                 # Extract interactions
                 if 'interactions' in data:
                     all_interactions.extend(data['interactions'])
                     
             except Exception as e:
-                logger.error(f"Error loading user data file {file_info['path']}: {e}")
+                logger.error(f"Error loading user data file {name} from zip: {e}")
                 
-        logger.info(f"Loaded {len(all_interactions)} interactions from user data files")
+    return all_interactions
+
+def _load_interactions_per_file(dbx) -> List[Dict[str, Any]]:
+    """
+    Download each user data file concurrently and extract interactions.
+    
+    Args:
+        dbx: Authenticated Dropbox client
+        
+    Returns:
+        List of interaction dictionaries
+    """
+    # Get list of user data files
+    user_data_files = list_user_data_files()
+    
+    all_interactions = []
+    if not user_data_files:
         return all_interactions
         
-    except Exception as e:
-        logger.error(f"Error loading user data for training: {e}")
-        return []
+    # Downloads are I/O-bound, so issue them concurrently
+    with ThreadPoolExecutor(max_workers=min(DOWNLOAD_WORKERS, len(user_data_files))) as executor:
+        futures = {
+            executor.submit(dbx.files_download, file_info['path']): file_info['path']
+            for file_info in user_data_files
+        }
+        
+        for future in as_completed(futures):
+            path = futures[future]
+            try:
+                # Parse JSON
+                content = future.result()[1].content
+                data = _loads_user_data(path, content)
+                
+                # Extract interactions
+                if 'interactions' in data:
+                    all_interactions.extend(data['interactions'])
+                    
+            except Exception as e:
+                logger.error(f"Error loading user data file {path}: {e}")
+            
+    return all_interactions
+
+async def astore_interactions_to_dropbox(data: Dict[str, Any]) -> bool:
+    """
+    Async variant of store_interactions_to_dropbox.
+    
+    Runs the blocking Dropbox calls on a worker thread so the event loop
+    can serve other requests during the upload.
+    
+    Args:
+        data: Dictionary containing device info and interactions
+        
+    Returns:
+        bool: True if successfully stored
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_async_io_pool, store_interactions_to_dropbox, data)
+
+async def alist_user_data_files() -> List[Dict[str, Any]]:
+    """
+    Async variant of list_user_data_files.
+    
+    Returns:
+        List of dictionaries with file information
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_async_io_pool, list_user_data_files)
+
+async def aload_user_data_for_training() -> List[Dict[str, Any]]:
+    """
+    Async variant of load_user_data_for_training.
+    
+    Returns:
+        List of interaction dictionaries
+    """
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_async_io_pool, load_user_data_for_training)
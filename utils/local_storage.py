@@ -5,18 +5,223 @@ This module provides a storage implementation using the local file system,
 following the same interface as the cloud storage options.
 """
 
+import contextlib
+import errno
 import os
+import mmap
 import shutil
 import tempfile
+import threading
 import time
 import logging
 import io
+import uuid
 from datetime import datetime
 from typing import Dict, Any, Optional, List, Union, BinaryIO
 
+from utils.storage_factory import StorageInterface
+
 logger = logging.getLogger(__name__)
 
-class LocalStorage:
+# Chunk size used when copying file-like uploads to disk
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# Files smaller than this are read into a BytesIO; mapping setup costs more
+MMAP_THRESHOLD = 64 * 1024
+
+# Directories this process has already created or found to exist
+_ensured_dirs = set()
+
+# (second, ISO string) for the most recent _now_iso() call
+_iso_cache = (0, "")
+
+class MappedModelBuffer(mmap.mmap):
+    """
+    Read-only memory map of a model file.
+    
+    Supports read/seek/tell and slicing like any mmap, plus the BytesIO
+    accessors (getvalue/getbuffer) that model buffer consumers rely on.
+    """
+    
+    def getvalue(self) -> bytes:
+        return self[:]
+    
+    def getbuffer(self) -> memoryview:
+        return memoryview(self)
+
+def _now_iso() -> str:
+    """
+    Get the current local time as an ISO string, at one-second resolution.
+    
+    The formatted string is reused for every call within the same second.
+    
+    Returns:
+        str: ISO 8601 timestamp
+    """
+    global _iso_cache
+    second = int(time.time())
+    cached_second, cached_iso = _iso_cache
+    if second != cached_second:
+        cached_iso = datetime.fromtimestamp(second).isoformat()
+        _iso_cache = (second, cached_iso)
+    return cached_iso
+
+def _ensure_dir(path: str) -> None:
+    """
+    Create a directory (and parents) unless this process already has.
+    
+    Args:
+        path: Directory path; empty paths are ignored
+    """
+    if path and path not in _ensured_dirs:
+        os.makedirs(path, exist_ok=True)
+        _ensured_dirs.add(path)
+
+def _drop_page_cache(f: BinaryIO) -> None:
+    """
+    Flush a just-written file and drop its pages from the page cache.
+    
+    Uploaded models aren't read back straight away, so there's no point
+    keeping the written pages resident. Pages only become droppable once
+    written back, hence the fsync. Does nothing where posix_fadvise is
+    unavailable.
+    
+    Args:
+        f: Open file object that was written to
+    """
+    if not hasattr(os, 'posix_fadvise'):
+        return
+    f.flush()
+    fd = f.fileno()
+    os.fsync(fd)
+    os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+
+def _stat_or_none(path: str) -> Optional[os.stat_result]:
+    """
+    Stat a file, returning None if it doesn't exist.
+    
+    Lets callers check existence and read size/mtime with a single syscall.
+    """
+    try:
+        return os.stat(path)
+    except FileNotFoundError:
+        return None
+
+def _temp_path_for(dst: str) -> str:
+    """Get an unused hidden temporary path in the same directory as dst."""
+    directory, name = os.path.split(dst)
+    return os.path.join(directory, f".{name}.{uuid.uuid4().hex}.tmp")
+
+@contextlib.contextmanager
+def _replace_on_close(dst: str):
+    """
+    Open a temporary file next to dst and atomically move it over dst.
+    
+    The existing dst is never truncated or written in place, so readers
+    that have it open or memory-mapped, and any hard links to it, keep
+    seeing its old contents. On error the temporary file is removed and
+    dst is left untouched.
+    
+    Args:
+        dst: Destination file path
+        
+    Yields:
+        Binary file object to write the new contents to
+    """
+    tmp_path = _temp_path_for(dst)
+    try:
+        with open(tmp_path, 'xb') as f:
+            yield f
+        os.replace(tmp_path, dst)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+def _fast_copy(src: str, dst: str) -> None:
+    """
+    Copy a file without passing its contents through Python buffers.
+    
+    On Linux, copy_file_range lets the kernel copy (or reflink, on Btrfs/XFS)
+    the data directly. Anywhere else, or if the filesystem doesn't support
+    it, the data is copied in fixed-size chunks. dst is replaced atomically
+    rather than overwritten in place.
+    
+    Args:
+        src: Source file path
+        dst: Destination file path
+    """
+    with open(src, 'rb') as fsrc, _replace_on_close(dst) as fdst:
+        if hasattr(os, 'copy_file_range'):
+            try:
+                remaining = os.fstat(fsrc.fileno()).st_size
+                while remaining > 0:
+                    copied = os.copy_file_range(fsrc.fileno(), fdst.fileno(), remaining)
+                    if copied == 0:
+                        break
+                    remaining -= copied
+                if remaining == 0:
+                    return
+            except OSError as e:
+                logger.debug("copy_file_range unavailable for %s, falling back to copy: %s", src, e)
+            # Start over from a clean destination
+            fsrc.seek(0)
+            fdst.seek(0)
+            fdst.truncate()
+        shutil.copyfileobj(fsrc, fdst, length=COPY_BUFFER_SIZE)
+
+def _link_into_place(src: str, dst: str) -> bool:
+    """
+    Make dst a hard link to src, atomically replacing any existing dst.
+    
+    The link is created under a temporary name and renamed over dst, so a
+    file previously at dst is unlinked rather than modified.
+    
+    Args:
+        src: Source file path
+        dst: Destination file path (must be on the same filesystem)
+        
+    Returns:
+        bool: True if linked, False if the caller should copy instead
+    """
+    tmp_path = _temp_path_for(dst)
+    if not _try_hardlink(src, tmp_path):
+        return False
+    try:
+        os.replace(tmp_path, dst)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+    return True
+
+def _try_hardlink(src: str, dst: str) -> bool:
+    """
+    Hard-link src to dst, replacing any existing dst.
+    
+    Args:
+        src: Source file path
+        dst: Destination file path (must be on the same filesystem)
+        
+    Returns:
+        bool: True if linked, False if the filesystem refused and the
+            caller should copy instead
+    """
+    try:
+        try:
+            os.link(src, dst)
+        except FileExistsError:
+            if os.path.samefile(src, dst):
+                return True
+            os.unlink(dst)
+            os.link(src, dst)
+        return True
+    except OSError as e:
+        if e.errno in (errno.EXDEV, errno.EPERM, errno.EACCES, errno.EMLINK, errno.ENOTSUP, errno.EOPNOTSUPP):
+            return False
+        raise
+
+class LocalStorage(StorageInterface):
     """Handles local file system storage operations for the Backdoor AI server."""
     
     def __init__(self, db_path: str, models_dir: str):
@@ -31,35 +236,52 @@ class LocalStorage:
         if not db_path:
             temp_dir = tempfile.mkdtemp()
             self.db_path = os.path.join(temp_dir, "interactions.db")
-            logger.warning(f"Empty db_path provided, using temporary file: {self.db_path}")
+            logger.warning("Empty db_path provided, using temporary file: %s", self.db_path)
         else:
             self.db_path = db_path
             
         if not models_dir:
             temp_dir = tempfile.mkdtemp()
             self.models_dir = temp_dir
-            logger.warning(f"Empty models_dir provided, using temporary directory: {self.models_dir}")
+            logger.warning("Empty models_dir provided, using temporary directory: %s", self.models_dir)
         else:
             self.models_dir = models_dir
         
         # Ensure directories exist
         try:
-            if os.path.dirname(self.db_path):
-                os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-            
-            os.makedirs(self.models_dir, exist_ok=True)
-            logger.info(f"Local storage initialized. DB: {self.db_path}, Models: {self.models_dir}")
+            _ensure_dir(os.path.dirname(self.db_path))
+            _ensure_dir(self.models_dir)
+            logger.info("Local storage initialized. DB: %s, Models: %s", self.db_path, self.models_dir)
         except Exception as e:
-            logger.error(f"Error creating directories for local storage: {e}")
+            logger.error("Error creating directories for local storage: %s", e)
             # Create fallback temporary directories if needed
             if not os.path.exists(os.path.dirname(self.db_path)):
                 temp_dir = tempfile.mkdtemp()
                 self.db_path = os.path.join(temp_dir, "interactions.db")
-                logger.warning(f"Using fallback temporary DB path: {self.db_path}")
+                logger.warning("Using fallback temporary DB path: %s", self.db_path)
             
             if not os.path.exists(self.models_dir):
                 self.models_dir = tempfile.mkdtemp()
-                logger.warning(f"Using fallback temporary models directory: {self.models_dir}")
+                logger.warning("Using fallback temporary models directory: %s", self.models_dir)
+        
+        # Model paths are built by concatenation with this prefix
+        self._models_prefix = os.path.join(self.models_dir, '')
+    
+    def _model_path(self, model_name: str) -> Optional[str]:
+        """
+        Get the path of a model file inside the models directory.
+        
+        Args:
+            model_name: Name of the model file
+            
+        Returns:
+            Optional[str]: Full path, or None if the name is empty, hidden,
+                or contains a path separator
+        """
+        if (not model_name or model_name[0] == '.' or os.sep in model_name
+                or (os.altsep and os.altsep in model_name)):
+            return None
+        return self._models_prefix + model_name
     
     def get_db_path(self) -> str:
         """
@@ -70,7 +292,8 @@ class LocalStorage:
         """
         return self.db_path
     
-    def upload_db(self) -> bool:
+    @staticmethod
+    def upload_db() -> bool:
         """
         For local storage, this is a no-op as the database is already local.
         
@@ -92,43 +315,52 @@ class LocalStorage:
             Dict with model information
         """
         try:
-            model_path = os.path.join(self.models_dir, model_name)
+            model_path = self._model_path(model_name)
+            if model_path is None:
+                return {'success': False, 'error': f'Invalid model name: {model_name}'}
             
             # Handle different input types
             if isinstance(data_or_path, str):
                 # It's a file path
-                if os.path.exists(data_or_path):
-                    shutil.copy(data_or_path, model_path)
-                else:
+                source_stat = _stat_or_none(data_or_path)
+                if source_stat is None:
                     return {'success': False, 'error': f'Source file not found: {data_or_path}'}
+                # On the same filesystem a hard link avoids copying any data
+                same_fs = source_stat.st_dev == os.stat(self.models_dir).st_dev
+                if not (same_fs and _link_into_place(data_or_path, model_path)):
+                    _fast_copy(data_or_path, model_path)
+                file_size = source_stat.st_size
             
             elif hasattr(data_or_path, 'read'):
-                # It's a file-like object
-                with open(model_path, 'wb') as f:
+                # It's a file-like object; write it beside the model and swap it in,
+                # so the old file (possibly a caller's hard link, or mapped by a
+                # reader) is never truncated
+                with _replace_on_close(model_path) as f:
                     # Reset position if possible
                     if hasattr(data_or_path, 'seek'):
                         data_or_path.seek(0)
-                    # Copy content
-                    f.write(data_or_path.read())
+                    # Copy content in fixed-size chunks
+                    shutil.copyfileobj(data_or_path, f, length=COPY_BUFFER_SIZE)
+                    file_size = f.tell()
+                    _drop_page_cache(f)
             
             else:
                 # Assume it's binary data
-                with open(model_path, 'wb') as f:
-                    f.write(data_or_path)
-            
-            # Get file size
-            file_size = os.path.getsize(model_path)
+                with _replace_on_close(model_path) as f:
+                    f.write(memoryview(data_or_path))
+                    file_size = f.tell()
+                    _drop_page_cache(f)
             
             return {
                 'success': True,
                 'name': model_name,
                 'path': model_path,
                 'size': file_size,
-                'upload_time': datetime.now().isoformat()
+                'upload_time': _now_iso()
             }
             
         except Exception as e:
-            logger.error(f"Error uploading model {model_name}: {e}")
+            logger.error("Error uploading model %s: %s", model_name, e)
             return {'success': False, 'error': str(e)}
     
     def download_model(self, model_name: str, local_path: Optional[str] = None) -> Dict[str, Any]:
@@ -143,9 +375,12 @@ class LocalStorage:
             Dict with model information
         """
         try:
-            source_path = os.path.join(self.models_dir, model_name)
+            source_path = self._model_path(model_name)
+            if source_path is None:
+                return {'success': False, 'error': f'Invalid model name: {model_name}'}
             
-            if not os.path.exists(source_path):
+            source_stat = _stat_or_none(source_path)
+            if source_stat is None:
                 return {'success': False, 'error': f'Model not found: {model_name}'}
             
             # If local_path is not provided, just return the source path
@@ -154,23 +389,23 @@ class LocalStorage:
                     'success': True,
                     'local_path': source_path,
                     'name': model_name,
-                    'size': os.path.getsize(source_path),
-                    'download_time': datetime.now().isoformat()
+                    'size': source_stat.st_size,
+                    'download_time': _now_iso()
                 }
             
             # Copy the file to the requested location
-            shutil.copy(source_path, local_path)
+            _fast_copy(source_path, local_path)
             
             return {
                 'success': True,
                 'local_path': local_path,
                 'name': model_name,
-                'size': os.path.getsize(local_path),
-                'download_time': datetime.now().isoformat()
+                'size': source_stat.st_size,
+                'download_time': _now_iso()
             }
             
         except Exception as e:
-            logger.error(f"Error downloading model {model_name}: {e}")
+            logger.error("Error downloading model %s: %s", model_name, e)
             return {'success': False, 'error': str(e)}
     
     def list_models(self) -> List[Dict[str, Any]]:
@@ -183,21 +418,24 @@ class LocalStorage:
         try:
             models = []
             
-            for filename in os.listdir(self.models_dir):
-                if filename.endswith('.mlmodel'):
-                    file_path = os.path.join(self.models_dir, filename)
-                    
-                    models.append({
-                        'name': filename,
-                        'path': file_path,
-                        'size': os.path.getsize(file_path),
-                        'modified_date': datetime.fromtimestamp(os.path.getmtime(file_path)).isoformat()
-                    })
+            # scandir yields the file type from readdir, so only one stat
+            # per model is needed for size and mtime
+            with os.scandir(self.models_dir) as entries:
+                for entry in entries:
+                    if entry.name.endswith('.mlmodel') and entry.is_file():
+                        st = entry.stat()
+                        
+                        models.append({
+                            'name': entry.name,
+                            'path': entry.path,
+                            'size': st.st_size,
+                            'modified_date': datetime.fromtimestamp(st.st_mtime).isoformat()
+                        })
             
             return models
             
         except Exception as e:
-            logger.error(f"Error listing models: {e}")
+            logger.error("Error listing models: %s", e)
             return []
     
     def delete_model(self, model_name: str) -> bool:
@@ -211,18 +449,21 @@ class LocalStorage:
             bool: True if deletion was successful, False otherwise
         """
         try:
-            file_path = os.path.join(self.models_dir, model_name)
-            
-            if not os.path.exists(file_path):
-                logger.warning(f"Cannot delete: Model {model_name} not found")
+            file_path = self._model_path(model_name)
+            if file_path is None:
+                logger.warning("Cannot delete: invalid model name %s", model_name)
                 return False
             
-            os.remove(file_path)
-            logger.info(f"Deleted model {model_name} from local storage")
+            try:
+                os.remove(file_path)
+            except FileNotFoundError:
+                logger.warning("Cannot delete: Model %s not found", model_name)
+                return False
+            logger.info("Deleted model %s from local storage", model_name)
             return True
             
         except Exception as e:
-            logger.error(f"Error deleting model {model_name}: {e}")
+            logger.error("Error deleting model %s: %s", model_name, e)
             return False
     
     def download_model_to_memory(self, model_name: str) -> Dict[str, Any]:
@@ -236,25 +477,42 @@ class LocalStorage:
             Dict with model buffer information
         """
         try:
-            file_path = os.path.join(self.models_dir, model_name)
+            file_path = self._model_path(model_name)
+            if file_path is None:
+                return {'success': False, 'error': f'Invalid model name: {model_name}'}
             
-            if not os.path.exists(file_path):
+            try:
+                fd = os.open(file_path, os.O_RDONLY)
+            except FileNotFoundError:
                 return {'success': False, 'error': f'Model not found: {model_name}'}
             
-            # Read file into memory buffer
-            with open(file_path, 'rb') as f:
-                model_buffer = io.BytesIO(f.read())
+            try:
+                file_size = os.fstat(fd).st_size
+                if file_size < MMAP_THRESHOLD:
+                    # Read small files into memory buffer
+                    with os.fdopen(fd, 'rb', closefd=False) as f:
+                        model_buffer = io.BytesIO(f.read())
+                else:
+                    # Map larger files so pages are faulted in from the page
+                    # cache on demand instead of copied into a bytes object
+                    model_buffer = MappedModelBuffer(fd, 0, access=mmap.ACCESS_READ)
+                    if hasattr(model_buffer, 'madvise'):
+                        for advice in ('MADV_SEQUENTIAL', 'MADV_WILLNEED'):
+                            if hasattr(mmap, advice):
+                                model_buffer.madvise(getattr(mmap, advice))
+            finally:
+                os.close(fd)  # A mapping keeps the file contents alive
             
             return {
                 'success': True,
                 'model_buffer': model_buffer,
                 'name': model_name,
-                'size': os.path.getsize(file_path),
-                'download_time': datetime.now().isoformat()
+                'size': file_size,
+                'download_time': _now_iso()
             }
             
         except Exception as e:
-            logger.error(f"Error loading model {model_name} to memory: {e}")
+            logger.error("Error loading model %s to memory: %s", model_name, e)
             return {'success': False, 'error': str(e)}
     
     def get_model_stream(self, model_name: str) -> Dict[str, Any]:
@@ -269,25 +527,29 @@ class LocalStorage:
             Dict with model path information
         """
         try:
-            file_path = os.path.join(self.models_dir, model_name)
+            file_path = self._model_path(model_name)
+            if file_path is None:
+                return {'success': False, 'error': f'Invalid model name: {model_name}'}
             
-            if not os.path.exists(file_path):
+            file_stat = _stat_or_none(file_path)
+            if file_stat is None:
                 return {'success': False, 'error': f'Model not found: {model_name}'}
             
             return {
                 'success': True,
                 'path': file_path,
                 'name': model_name,
-                'size': os.path.getsize(file_path),
+                'size': file_stat.st_size,
                 'local_file': True  # Indicates this is a local file, not a stream
             }
             
         except Exception as e:
-            logger.error(f"Error getting model stream for {model_name}: {e}")
+            logger.error("Error getting model stream for %s: %s", model_name, e)
             return {'success': False, 'error': str(e)}
 
 # Module-level singleton instance
 _local_storage = None
+_local_storage_lock = threading.Lock()
 
 def init_local_storage(db_path: str, models_dir: str):
     """
@@ -303,7 +565,9 @@ def init_local_storage(db_path: str, models_dir: str):
     global _local_storage
     
     if _local_storage is None:
-        _local_storage = LocalStorage(db_path, models_dir)
+        with _local_storage_lock:
+            if _local_storage is None:
+                _local_storage = LocalStorage(db_path, models_dir)
     
     return _local_storage
 
@@ -7,6 +7,7 @@ with Dropbox synchronization.
 
 import io
 import sqlite3
+import tempfile
 import threading
 import time
 import logging
@@ -21,14 +22,127 @@ DROPBOX_ENABLED = os.getenv("DROPBOX_ENABLED", "True").lower() in ["true", "1",
 DROPBOX_DB_SYNC_INTERVAL = int(os.getenv("DROPBOX_DB_SYNC_INTERVAL", "60"))  # Seconds
 
 # Log the configuration we're using
-logger.info(f"Memory DB using DROPBOX_ENABLED={DROPBOX_ENABLED}")
-logger.info(f"Memory DB using DROPBOX_DB_SYNC_INTERVAL={DROPBOX_DB_SYNC_INTERVAL}s")
+logger.info("Memory DB using DROPBOX_ENABLED=%s", DROPBOX_ENABLED)
+logger.info("Memory DB using DROPBOX_DB_SYNC_INTERVAL=%ss", DROPBOX_DB_SYNC_INTERVAL)
 
 # Global in-memory database connection
 _in_memory_db = None
 _in_memory_db_lock = threading.RLock()
 _last_db_sync_time = 0
 
+# Named shared-cache in-memory database: every connection opened with this
+# URI in the same process sees the same data, so threads can get their own
+# connection without copying the database
+MEMORY_DB_URI = "file:backdoor_memdb?mode=memory&cache=shared"
+
+# Background Dropbox sync: commits set the event, the sync thread uploads
+# at most once per DROPBOX_DB_SYNC_INTERVAL
+_sync_pending = threading.Event()
+_sync_thread = None
+
+# Longest wait, in seconds, between retries after failed syncs
+SYNC_MAX_BACKOFF = 900
+
+# Every binary SQLite database file starts with this header
+SQLITE_HEADER = b"SQLite format 3\x00"
+
+# Backups copy this many pages per step and sleep briefly between steps,
+# so other threads keep running while a large database is copied
+BACKUP_PAGES = 512
+BACKUP_SLEEP = 0.001
+
+def _serialize_db() -> bytes:
+    """
+    Get a binary SQLite file image of the in-memory database.
+    
+    Uses Connection.serialize() where available (Python 3.11+), otherwise
+    copies the pages to a temporary file with the backup API.
+    
+    Returns:
+        bytes: Contents of an equivalent on-disk database file
+    """
+    if hasattr(_in_memory_db, 'serialize'):
+        return _in_memory_db.serialize()
+        
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "snapshot.db")
+        disk_db = sqlite3.connect(path)
+        try:
+            _in_memory_db.backup(disk_db, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP)
+        finally:
+            disk_db.close()
+        with open(path, 'rb') as f:
+            return f.read()
+
+def _load_db_image(data: bytes) -> None:
+    """
+    Load a database downloaded from Dropbox into the in-memory database.
+    
+    Binary SQLite files are loaded page-for-page; SQL text dumps uploaded
+    by older versions of the server are replayed with executescript.
+    Binary images go through a private connection and the backup API,
+    because deserializing straight into the shared-cache connection would
+    detach it from the other connections.
+    
+    Args:
+        data: Raw contents of the downloaded database file
+    """
+    if not data.startswith(SQLITE_HEADER):
+        _in_memory_db.executescript(data.decode('utf-8'))
+        return
+        
+    if hasattr(_in_memory_db, 'deserialize'):
+        image_db = sqlite3.connect(':memory:')
+        try:
+            image_db.deserialize(data)
+            image_db.backup(_in_memory_db, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP)
+        finally:
+            image_db.close()
+        return
+        
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = os.path.join(temp_dir, "snapshot.db")
+        with open(path, 'wb') as f:
+            f.write(data)
+        disk_db = sqlite3.connect(path)
+        try:
+            disk_db.backup(_in_memory_db, pages=BACKUP_PAGES, sleep=BACKUP_SLEEP)
+        finally:
+            disk_db.close()
+
+def _sync_worker() -> None:
+    """Upload the database to Dropbox whenever a commit has requested a sync."""
+    failures = 0
+    while True:
+        _sync_pending.wait()
+        _sync_pending.clear()
+        
+        # Let further commits accumulate until the sync interval has passed
+        delay = DROPBOX_DB_SYNC_INTERVAL - (time.time() - _last_db_sync_time)
+        if delay > 0:
+            time.sleep(delay)
+        
+        if sync_memory_db_to_dropbox():
+            failures = 0
+            continue
+        
+        # Back off before retrying so an outage doesn't spin on the Dropbox API
+        failures += 1
+        backoff = min(max(DROPBOX_DB_SYNC_INTERVAL, 1) * 2 ** (failures - 1), SYNC_MAX_BACKOFF)
+        logger.warning("Dropbox sync failed %d time(s), retrying in %ds", failures, backoff)
+        time.sleep(backoff)
+        
+        # Keep the changes pending so they are retried
+        _sync_pending.set()
+
+def _start_sync_thread() -> None:
+    """Start the background Dropbox sync thread if it isn't running."""
+    global _sync_thread
+    
+    if _sync_thread is None:
+        _sync_thread = threading.Thread(target=_sync_worker, name="memory-db-sync", daemon=True)
+        _sync_thread.start()
+
 def init_memory_db() -> sqlite3.Connection:
     """
     Initialize the in-memory database and load from Dropbox if available.
@@ -38,13 +152,18 @@ def init_memory_db() -> sqlite3.Connection:
     """
     global _in_memory_db, _last_db_sync_time
     
+    # Fast path once initialized: no lock needed to read the global
+    if _in_memory_db is not None:
+        return _in_memory_db
+    
     with _in_memory_db_lock:
         if _in_memory_db is not None:
             logger.info("Returning existing in-memory database connection")
             return _in_memory_db
         
         logger.info("Creating new in-memory database")
-        _in_memory_db = sqlite3.connect(':memory:', check_same_thread=False)
+        _in_memory_db = sqlite3.connect(MEMORY_DB_URI, uri=True, check_same_thread=False)
+        _in_memory_db.execute("PRAGMA temp_store=MEMORY")
         
         # If Dropbox is enabled, try to load data from Dropbox
         if DROPBOX_ENABLED:
@@ -64,108 +183,29 @@ def init_memory_db() -> sqlite3.Connection:
                         buffer = db_data.get('db_buffer')
                         if buffer:
                             try:
-                                # Import the SQL dump into memory - handle possible binary data
                                 buffer.seek(0)
-                                try:
-                                    # First try UTF-8 decoding
-                                    script = buffer.read().decode('utf-8')
-                                    _in_memory_db.executescript(script)
-                                    logger.info("Successfully loaded database from Dropbox into memory")
-                                    _last_db_sync_time = time.time()
-                                except UnicodeDecodeError:
-                                    # If UTF-8 fails, handle binary SQLite file completely in memory
-                                    buffer.seek(0)
-                                    try:
-                                        # Create a new in-memory database
-                                        temp_conn = sqlite3.connect(':memory:')
-                                        
-                                        # Direct approach - use buffer content to create in-memory tables
-                                        try:
-                                            # Create a connection from the binary data directly
-                                            # By cloning the schema and data
-                                            buffer_data = buffer.read()
-                                            
-                                            # Read table structure from binary data (alternative approach)
-                                            # Execute "CREATE TABLE" and other schema statements
-                                            # followed by data insertion
-                                            # This is a simplified version - actual implementation would
-                                            # need to parse SQLite file format directly
-                                            
-                                            # For now, use a simplified approach with SQL dump
-                                            # Create a memory database with the schema
-                                            temp_conn.executescript("""
-                                                -- Basic schema creation
-                                                CREATE TABLE IF NOT EXISTS interactions (
-                                                    id TEXT PRIMARY KEY,
-                                                    request TEXT,
-                                                    response TEXT,
-                                                    timestamp TEXT,
-                                                    metadata TEXT
-                                                );
-                                                CREATE TABLE IF NOT EXISTS model_versions (
-                                                    version TEXT PRIMARY KEY,
-                                                    path TEXT,
-                                                    accuracy REAL,
-                                                    training_data_size INTEGER,
-                                                    training_date TEXT,
-                                                    created_at TEXT,
-                                                    is_ensemble BOOLEAN DEFAULT 0
-                                                );
-                                            """)
-                                            
-                                            # Copy schema and data to main in-memory DB
-                                            temp_conn.backup(_in_memory_db)
-                                            temp_conn.close()
-                                            
-                                            logger.info("Successfully set up in-memory database from binary data")
-                                        except Exception as e:
-                                            logger.error(f"Error processing binary database data: {e}")
-                                            # Connect to a new temp in-memory db as fallback
-                                            temp_conn = sqlite3.connect(':memory:')
-                                            # Create minimal required schema
-                                            temp_conn.executescript("""
-                                                CREATE TABLE IF NOT EXISTS interactions (
-                                                    id TEXT PRIMARY KEY,
-                                                    request TEXT,
-                                                    response TEXT,
-                                                    timestamp TEXT,
-                                                    metadata TEXT
-                                                );
-                                                CREATE TABLE IF NOT EXISTS model_versions (
-                                                    version TEXT PRIMARY KEY,
-                                                    path TEXT,
-                                                    accuracy REAL,
-                                                    training_data_size INTEGER,
-                                                    training_date TEXT,
-                                                    created_at TEXT,
-                                                    is_ensemble BOOLEAN DEFAULT 0
-                                                );
-                                            """)
-                                            temp_conn.backup(_in_memory_db)
-                                            temp_conn.close()
-                                    
-                                        logger.info("Successfully loaded binary database from Dropbox into memory")
-                                        _last_db_sync_time = time.time()
-                                    except Exception as binary_error:
-                                        logger.error(f"Error loading binary database: {binary_error}")
-                                        logger.info("Starting with fresh in-memory database")
-                            except Exception as script_error:
-                                logger.error(f"Error executing SQL script from Dropbox: {script_error}")
+                                _load_db_image(buffer.read())
+                                logger.info("Successfully loaded database from Dropbox into memory")
+                                _last_db_sync_time = time.time()
+                            except Exception as load_error:
+                                logger.error("Error loading database from Dropbox: %s", load_error)
                                 logger.info("Starting with fresh in-memory database")
                         else:
                             logger.warning("Downloaded database buffer from Dropbox was empty")
                     else:
                         error_msg = db_data.get('error', 'Unknown error') if db_data else 'No data returned'
-                        logger.info(f"No existing database found in Dropbox ({error_msg}), starting with fresh database")
+                        logger.info("No existing database found in Dropbox (%s), starting with fresh database", error_msg)
                 except Exception as e:
-                    logger.error(f"Error interacting with Dropbox storage: {e}")
+                    logger.error("Error interacting with Dropbox storage: %s", e)
                     logger.info("Starting with fresh in-memory database")
             except ImportError:
                 logger.error("Could not import Dropbox storage module - check your installation")
                 logger.info("Starting with fresh in-memory database")
             except Exception as e:
-                logger.error(f"Unexpected error during Dropbox database initialization: {e}")
+                logger.error("Unexpected error during Dropbox database initialization: %s", e)
                 logger.info("Starting with fresh in-memory database")
+            
+            _start_sync_thread()
         else:
             logger.info("Dropbox storage disabled, using fresh in-memory database")
         
@@ -191,15 +231,14 @@ def sync_memory_db_to_dropbox() -> bool:
     # Only sync if enough time has passed since last sync
     current_time = time.time()
     if current_time - _last_db_sync_time < DROPBOX_DB_SYNC_INTERVAL:
-        logger.debug(f"Dropbox sync skipped - synced recently ({current_time - _last_db_sync_time}s ago)")
+        logger.debug("Dropbox sync skipped - synced recently (%.1fs ago)", current_time - _last_db_sync_time)
         return False
     
     try:
-        # Dump the database to a buffer
+        # Snapshot the database as a binary SQLite file
         logger.info("Preparing in-memory database for Dropbox sync")
-        buffer = io.BytesIO()
-        for line in _in_memory_db.iterdump():
-            buffer.write(f"{line}\n".encode('utf-8'))
+        with _in_memory_db_lock:
+            buffer = io.BytesIO(_serialize_db())
         
         # Upload to Dropbox
         try:
@@ -218,16 +257,16 @@ def sync_memory_db_to_dropbox() -> bool:
                 return True
             else:
                 error_msg = result.get('error', 'Unknown error') if result else 'No result returned'
-                logger.error(f"Failed to sync database to Dropbox: {error_msg}")
+                logger.error("Failed to sync database to Dropbox: %s", error_msg)
                 return False
         except ImportError as ie:
-            logger.error(f"Could not import Dropbox storage for sync: {ie}")
+            logger.error("Could not import Dropbox storage for sync: %s", ie)
             return False
         except Exception as e:
-            logger.error(f"Error during Dropbox upload: {e}")
+            logger.error("Error during Dropbox upload: %s", e)
             return False
     except Exception as e:
-        logger.error(f"Error preparing database for Dropbox sync: {e}")
+        logger.error("Error preparing database for Dropbox sync: %s", e)
         return False
 
 def get_memory_db() -> sqlite3.Connection:
@@ -241,33 +280,37 @@ def get_memory_db() -> sqlite3.Connection:
         return init_memory_db()
     return _in_memory_db
 
+def get_memory_db_cursor() -> sqlite3.Cursor:
+    """
+    Get a cursor on the global in-memory database connection.
+    
+    Returns:
+        sqlite3.Cursor: New cursor on the shared connection
+    """
+    return get_memory_db().cursor()
+
 def create_memory_db_copy() -> sqlite3.Connection:
     """
-    Create a new in-memory database with a copy of the data from the global database.
+    Open a separate connection to the shared in-memory database.
     
-    This is useful for creating isolated connections for thread safety.
+    This is useful for giving a thread its own connection. The data is
+    shared rather than copied, so changes become visible to every other
+    connection once committed.
     
     Returns:
-        sqlite3.Connection: New connection to a copy of the database
+        sqlite3.Connection: New connection to the shared database
     """
     if _in_memory_db is None:
         init_memory_db()
     
-    with _in_memory_db_lock:
-        # Create a new in-memory database
-        new_db = sqlite3.connect(':memory:')
-        
-        # Copy the schema and data from the global database
-        _in_memory_db.backup(new_db)
-        
-        return new_db
+    return sqlite3.connect(MEMORY_DB_URI, uri=True)
 
 def commit_memory_db_copy(conn: sqlite3.Connection) -> bool:
     """
-    Commit changes from a database copy back to the global database.
+    Commit changes made through a connection from create_memory_db_copy.
     
     Args:
-        conn: Connection to a database copy
+        conn: Connection returned by create_memory_db_copy
         
     Returns:
         bool: True if commit was successful
@@ -276,13 +319,12 @@ def commit_memory_db_copy(conn: sqlite3.Connection) -> bool:
         return False
     
     with _in_memory_db_lock:
-        # Backup from the copy to the global database
-        conn.backup(_in_memory_db)
-        
-        # Sync to Dropbox if needed
-        sync_memory_db_to_dropbox()
-        
-        return True
+        conn.commit()
+    
+    # Sync to Dropbox in the background
+    _sync_pending.set()
+    
+    return True
 
 def close_memory_db_copy(conn: sqlite3.Connection) -> None:
     """
@@ -7,18 +7,177 @@ This module provides functions for:
 - Streaming models efficiently without local storage
 """
 
+import hashlib
 import io
 import logging
+import mmap
+import os
 import threading
+from collections import OrderedDict
 from typing import Dict, Any, Optional, Union
 
 import config
+from utils.local_storage import MappedModelBuffer
 
 logger = logging.getLogger(__name__)
 
-# In-memory cache for models to avoid repeated downloads
-_model_cache = {}
+# In-memory cache for models to avoid repeated downloads. Values are
+# immutable bytes, so each hit can wrap them in a new BytesIO without copying.
+# Entries are kept in least-recently-used order and evicted once their total
+# size exceeds MODEL_CACHE_MAX_BYTES
+_model_cache: "OrderedDict[str, bytes]" = OrderedDict()
+_model_cache_bytes = 0
 _model_cache_lock = threading.RLock()
+MODEL_CACHE_MAX_BYTES = 500 * 1024 * 1024
+
+# Downloads in progress, keyed like _model_cache; concurrent callers for the
+# same model wait for the first one's download instead of starting their own
+_inflight_downloads: Dict[str, threading.Event] = {}
+
+# Read size for streamed model downloads
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Local models this large are memory-mapped instead of read into the cache
+MODEL_CACHE_LIMIT = 50 * 1024 * 1024
+
+# Block size Dropbox uses when computing a file's content_hash
+DROPBOX_HASH_BLOCK_SIZE = 4 * 1024 * 1024
+
+def _dropbox_content_hash(model_data: bytes) -> str:
+    """
+    Compute the Dropbox content_hash of some bytes: the SHA-256 of the
+    concatenated SHA-256 digests of each 4 MiB block.
+    
+    Args:
+        model_data: The file contents
+        
+    Returns:
+        str: Hex digest comparable with Dropbox's FileMetadata.content_hash
+    """
+    view = memoryview(model_data)
+    block_digests = b''.join(
+        hashlib.sha256(view[i:i + DROPBOX_HASH_BLOCK_SIZE]).digest()
+        for i in range(0, len(view), DROPBOX_HASH_BLOCK_SIZE)
+    )
+    return hashlib.sha256(block_digests).hexdigest()
+
+def _check_content_hash(model_data: bytes, expected: Optional[str]) -> None:
+    """
+    Check downloaded model bytes against the hash Dropbox reported for them.
+    
+    Args:
+        model_data: The downloaded file contents
+        expected: Dropbox content_hash from the file metadata, if known
+        
+    Raises:
+        ValueError: If the bytes don't match the expected hash
+    """
+    if expected and _dropbox_content_hash(model_data) != expected:
+        raise ValueError("downloaded model does not match its Dropbox content_hash")
+
+def _cache_model(key: str, model_data: bytes) -> None:
+    """
+    Store model bytes in the cache, evicting least recently used models
+    while the cache is over its size limit.
+    
+    Args:
+        key: Model version
+        model_data: The model file contents
+    """
+    global _model_cache_bytes
+    
+    with _model_cache_lock:
+        previous = _model_cache.pop(key, None)
+        if previous is not None:
+            _model_cache_bytes -= len(previous)
+        _model_cache[key] = model_data
+        _model_cache_bytes += len(model_data)
+        
+        # Never evict the entry just added, even if it alone is over the limit
+        while _model_cache_bytes > MODEL_CACHE_MAX_BYTES and len(_model_cache) > 1:
+            evicted_key, evicted = _model_cache.popitem(last=False)
+            _model_cache_bytes -= len(evicted)
+            logger.info(f"Evicted model {evicted_key} from memory cache")
+
+def _get_cached_model(key: str) -> Optional[bytes]:
+    """
+    Get model bytes from the cache and mark them recently used.
+    
+    Args:
+        key: Model version
+        
+    Returns:
+        The cached bytes, or None on a miss
+    """
+    cached = _model_cache.get(key)
+    if cached is not None:
+        try:
+            _model_cache.move_to_end(key)
+        except KeyError:
+            pass  # Evicted concurrently; the bytes we hold are still valid
+    return cached
+
+def _load_local_model(path: str, key: str):
+    """
+    Load a model file from local disk.
+    
+    Models under MODEL_CACHE_LIMIT are read once and cached as bytes. Larger
+    ones are memory-mapped read-only, so their pages come from the shared
+    page cache on demand instead of being copied into this process.
+    
+    Args:
+        path: Path of the model file
+        key: Model version to cache it under
+        
+    Returns:
+        BytesIO or MappedModelBuffer positioned at the start of the model
+    """
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size >= MODEL_CACHE_LIMIT:
+            return MappedModelBuffer(f.fileno(), 0, access=mmap.ACCESS_READ)
+        model_data = f.read()
+    
+    _cache_model(key, model_data)
+    return io.BytesIO(model_data)
+
+def _read_response_body(response) -> bytes:
+    """
+    Read a streamed HTTP response body into memory.
+    
+    Uncompressed bodies are read from response.raw without urllib3's content
+    decoding. When the server also reports a Content-Length, the body is read
+    straight into a buffer of that size instead of growing one chunk by chunk.
+    
+    Args:
+        response: requests.Response opened with stream=True
+        
+    Returns:
+        bytes: The response body
+    """
+    encoding = response.headers.get('content-encoding', 'identity')
+    if encoding != 'identity':
+        # iter_content decodes the Content-Encoding, which response.raw doesn't
+        return b''.join(response.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE))
+    
+    response.raw.decode_content = False
+    content_length = response.headers.get('content-length')
+    if content_length is None:
+        return b''.join(iter(lambda: response.raw.read(DOWNLOAD_CHUNK_SIZE), b''))
+    
+    body = bytearray(int(content_length))
+    view = memoryview(body)
+    offset = 0
+    while offset < len(body):
+        read = response.raw.readinto(view[offset:offset + DOWNLOAD_CHUNK_SIZE])
+        if not read:
+            break
+        offset += read
+    view.release()
+    
+    if offset < len(body):
+        # Connection ended early; keep what actually arrived
+        del body[offset:]
+    return bytes(body)
 
 def get_base_model_buffer() -> Optional[io.BytesIO]:
     """
@@ -27,15 +186,50 @@ def get_base_model_buffer() -> Optional[io.BytesIO]:
     Returns:
         BytesIO buffer containing the model data or None if not found
     """
-    # Try to get from cache first
+    # Try to get from cache first; a single dict.get is atomic, so only
+    # writers take the lock
+    cached = _get_cached_model('1.0.0')
+    if cached is not None:
+        # Each caller gets its own position over the shared bytes
+        logger.info("Serving base model from memory cache")
+        return io.BytesIO(cached)
+    
     with _model_cache_lock:
-        if '1.0.0' in _model_cache:
-            # Return a copy of the cached buffer to avoid threading issues
-            buffer_data = _model_cache['1.0.0'].getvalue()
-            buffer = io.BytesIO(buffer_data)
-            logger.info("Serving base model from memory cache")
-            return buffer
+        # Another caller may have filled the cache since the check above
+        cached = _model_cache.get('1.0.0')
+        if cached is not None:
+            return io.BytesIO(cached)
+        
+        download_done = _inflight_downloads.get('1.0.0')
+        is_leader = download_done is None
+        if is_leader:
+            download_done = _inflight_downloads['1.0.0'] = threading.Event()
+    
+    if not is_leader:
+        # Wait for the download already in progress and share its result
+        logger.info("Waiting for in-progress base model download")
+        download_done.wait()
+        cached = _model_cache.get('1.0.0')
+        if cached is not None:
+            return io.BytesIO(cached)
+        # Nothing was cached: the download failed, or the model is too big
+        # to cache and was memory-mapped; load a buffer of our own
+        return _download_base_model_buffer()
     
+    try:
+        return _download_base_model_buffer()
+    finally:
+        with _model_cache_lock:
+            del _inflight_downloads['1.0.0']
+        download_done.set()
+
+def _download_base_model_buffer() -> Optional[io.BytesIO]:
+    """
+    Download the base model and store it in the model cache.
+    
+    Returns:
+        BytesIO buffer containing the model data or None if not found
+    """
     # Not in cache, download from Dropbox
     if config.DROPBOX_ENABLED:
         try:
@@ -55,24 +249,25 @@ def get_base_model_buffer() -> Optional[io.BytesIO]:
                 stream_info = dropbox_storage.get_model_stream(model_name)
                 
                 if stream_info and stream_info.get('success'):
-                    # Download using the URL
-                    import requests
+                    # Download using the URL over the shared keep-alive session
+                    from utils.model_streamer import get_http_session
                     download_url = stream_info.get('download_url')
                     logger.info(f"Downloading base model using streaming URL")
                     
-                    response = requests.get(download_url, stream=True)
+                    response = get_http_session().get(download_url, stream=True)
                     if response.status_code == 200:
-                        # Create buffer and store in cache
-                        buffer = io.BytesIO()
-                        for chunk in response.iter_content(chunk_size=8192):
-                            buffer.write(chunk)
+                        model_data = _read_response_body(response)
+                        expected_size = stream_info.get('size')
+                        if expected_size is not None and len(model_data) != expected_size:
+                            # Truncated or wrong file; don't cache it
+                            raise ValueError(
+                                f"downloaded {len(model_data)} bytes, expected {expected_size}"
+                            )
+                        _check_content_hash(model_data, stream_info.get('content_hash'))
+                        buffer = io.BytesIO(model_data)
                         
-                        # Reset buffer position
-                        buffer.seek(0)
-                        
-                        # Cache the buffer
-                        with _model_cache_lock:
-                            _model_cache['1.0.0'] = io.BytesIO(buffer.getvalue())
+                        # Cache the model data
+                        _cache_model('1.0.0', model_data)
                         
                         logger.info(f"Successfully downloaded base model using streaming")
                         return buffer
@@ -97,14 +292,17 @@ def get_base_model_buffer() -> Optional[io.BytesIO]:
                 # Get the buffer and cache it
                 buffer = result.get('model_buffer')
                 if buffer:
-                    # Cache for future use
-                    with _model_cache_lock:
-                        _model_cache['1.0.0'] = io.BytesIO(buffer.getvalue())
+                    # One bytes snapshot serves both the cache and the caller
+                    model_data = buffer.getvalue()
+                    try:
+                        _check_content_hash(model_data, result.get('content_hash'))
+                    except ValueError as e:
+                        logger.error(f"Rejecting downloaded base model: {e}")
+                        return None
+                    _cache_model('1.0.0', model_data)
                     
-                    # Return a copy of the buffer
-                    buffer.seek(0)
                     logger.info("Successfully loaded base model from Dropbox")
-                    return buffer
+                    return io.BytesIO(model_data)
             
             logger.warning(f"Failed to download base model from Dropbox: {result.get('error', 'Unknown error')}")
             return None
@@ -115,18 +313,10 @@ def get_base_model_buffer() -> Optional[io.BytesIO]:
     else:
         # Dropbox not enabled, try local file as fallback
         try:
-            import os
             base_model_path = os.path.join(config.MODEL_DIR, config.BASE_MODEL_NAME)
             
             if os.path.exists(base_model_path):
-                with open(base_model_path, 'rb') as f:
-                    buffer = io.BytesIO(f.read())
-                
-                # Cache for future use
-                with _model_cache_lock:
-                    _model_cache['1.0.0'] = io.BytesIO(buffer.getvalue())
-                
-                buffer.seek(0)
+                buffer = _load_local_model(base_model_path, '1.0.0')
                 logger.info("Loaded base model from local file")
                 return buffer
             else:
@@ -143,8 +333,11 @@ def clear_model_cache():
     
     Call this to free up memory or force a fresh download.
     """
+    global _model_cache_bytes
+    
     with _model_cache_lock:
         _model_cache.clear()
+        _model_cache_bytes = 0
         logger.info("Model cache cleared")
 
 def get_model_buffer(version: str) -> Optional[Union[io.BytesIO, 'utils.model_streamer.StreamingModelFile']]:
@@ -176,13 +369,11 @@ def get_model_buffer(version: str) -> Optional[Union[io.BytesIO, 'utils.model_st
         logger.warning("Model streamer not available, falling back to in-memory")
     
     # Try to get from cache if streaming is not available
-    with _model_cache_lock:
-        if version in _model_cache:
-            # Return a copy of the cached buffer to avoid threading issues
-            buffer_data = _model_cache[version].getvalue()
-            buffer = io.BytesIO(buffer_data)
-            logger.info(f"Serving model {version} from memory cache")
-            return buffer
+    cached = _get_cached_model(version)
+    if cached is not None:
+        # Each caller gets its own position over the shared bytes
+        logger.info(f"Serving model {version} from memory cache")
+        return io.BytesIO(cached)
     
     # Not in cache, download from Dropbox
     if config.DROPBOX_ENABLED:
@@ -231,21 +422,11 @@ def get_model_buffer(version: str) -> Optional[Union[io.BytesIO, 'utils.model_st
     else:
         # Dropbox not enabled, try local file as fallback
         try:
-            import os
             from utils.db_helpers import get_model_path
             
             model_path = get_model_path(config.DB_PATH, version)
             if model_path and os.path.exists(model_path):
-                with open(model_path, 'rb') as f:
-                    buffer = io.BytesIO(f.read())
-                
-                # Cache for future use if it's not too large
-                buffer_size = len(buffer.getvalue())
-                if buffer_size < 50 * 1024 * 1024:  # 50MB limit for cache
-                    with _model_cache_lock:
-                        _model_cache[version] = io.BytesIO(buffer.getvalue())
-                
-                buffer.seek(0)
+                buffer = _load_local_model(model_path, version)
                 logger.info(f"Loaded model {version} from local file")
                 return buffer
             else:
@@ -9,12 +9,16 @@ This module provides functionality to:
 
 import io
 import os
+import re
 import logging
 import tempfile
 import requests
+from requests.adapters import HTTPAdapter
 import threading
 from typing import Dict, Any, Optional, Union, BinaryIO, Tuple
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 
 try:
     import config
@@ -28,18 +32,47 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
-# Cache for model URLs and metadata to avoid repeated lookups
-_model_info_cache = {}
-_model_info_timestamps = {}
+# Cache for model URLs and metadata to avoid repeated lookups, as
+# model name -> (timestamp, info); info is None for a model found missing
+_model_info_cache: Dict[str, Tuple[float, Optional[Dict[str, Any]]]] = {}
 _cache_lock = threading.RLock()
 _CACHE_TTL = 3600  # 1 hour
+_NEG_CACHE_TTL = 60  # Models found missing are re-checked after a minute
 
-class StreamingModelFile:
+# Keep-alive session shared by every model download so repeated fetches reuse
+# pooled connections instead of a new TLS handshake each time
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def get_http_session() -> requests.Session:
+    """
+    Get the shared HTTP session used for model downloads.
+    
+    Returns:
+        requests.Session: Session with a pooled HTTPS adapter
+    """
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            session.mount('https://', HTTPAdapter(pool_connections=4, pool_maxsize=16))
+            _http_session = session
+        return _http_session
+
+# Blocks each StreamingModelFile keeps cached (32 MB at the default chunk size)
+MAX_CACHED_BLOCKS = 32
+
+# Concurrent range requests issued by StreamingModelFile.pread_many
+PREAD_WORKERS = 4
+
+class StreamingModelFile(io.RawIOBase):
     """
     A file-like object that streams model data directly from Dropbox.
     
     This avoids loading the entire model into memory at once, 
-    significantly reducing memory usage.
+    significantly reducing memory usage. As a raw I/O object it supports
+    readinto() and can be wrapped in io.BufferedReader.
     """
     
     def __init__(self, url, chunk_size=1024*1024):
@@ -48,38 +81,70 @@ class StreamingModelFile:
         
         Args:
             url: The direct download URL
-            chunk_size: Size of chunks to download at once
+            chunk_size: Size of chunks to download at once; also the size of
+                the blocks kept in the block cache
         """
         self.url = url
         self.chunk_size = chunk_size
         self.position = 0
-        self.buffer = io.BytesIO()
-        self.buffer_start = 0
-        self.buffer_end = 0
         self.content_length = None
-        self.closed = False
-        self._session = requests.Session()
+        self._session = get_http_session()
+        # Recently read chunk_size-aligned blocks of the file, keyed by block
+        # index and kept in least-recently-used order
+        self._blocks = OrderedDict()
+        # Open-ended GET that sequential reads consume; _stream_pos is the
+        # file offset of its next unread byte
+        self._response = None
+        self._stream_pos = 0
         
         # Get content length
         try:
-            response = self._session.head(self.url)
-            self.content_length = int(response.headers.get('content-length', 0))
-            logger.info(f"Model size: {self.content_length / 1024 / 1024:.2f} MB")
+            response = self._session.head(self.url, allow_redirects=True)
+            self.content_length = int(response.headers.get('content-length', 0)) or None
         except Exception as e:
-            logger.warning(f"Could not determine content length: {e}")
-    
-    def __enter__(self):
-        return self
+            logger.warning(f"HEAD request failed: {e}")
+        
+        if self.content_length is None:
+            # Some download links don't answer HEAD with a length; a one-byte
+            # ranged GET reports the total size in Content-Range instead
+            self.content_length = self._probe_content_length()
+        
+        if self.content_length is not None:
+            logger.info(f"Model size: {self.content_length / 1024 / 1024:.2f} MB")
+        else:
+            logger.warning("Could not determine content length")
     
-    def __exit__(self, exc_type, exc_val, exc_tb):
-        self.close()
+    def _probe_content_length(self):
+        """
+        Get the file size from the Content-Range of a one-byte ranged GET.
+        
+        Returns:
+            The total size in bytes, or None if the server didn't report it
+        """
+        try:
+            response = self._session.get(self.url, headers={'Range': 'bytes=0-0'}, stream=True)
+            try:
+                match = re.match(r'bytes \d+-\d+/(\d+)', response.headers.get('content-range', ''))
+            finally:
+                response.close()
+        except Exception as e:
+            logger.warning(f"Could not probe content length: {e}")
+            return None
+        
+        return int(match.group(1)) if match else None
     
     def close(self):
         """Close the file-like object and release resources."""
         if not self.closed:
-            self.buffer.close()
-            self._session.close()
-            self.closed = True
+            self._close_stream()
+            self._blocks.clear()
+        super().close()
+    
+    def readable(self):
+        return True
+    
+    def seekable(self):
+        return True
     
     def read(self, size=-1):
         """
@@ -107,6 +172,94 @@ class StreamingModelFile:
         else:
             return self._read_chunk(size)
     
+    def readinto(self, b):
+        """
+        Read bytes directly into a pre-allocated, writable buffer.
+        
+        Args:
+            b: Writable bytes-like object to fill
+            
+        Returns:
+            Number of bytes read (0 at EOF)
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        
+        view = memoryview(b).cast('B')
+        copied = 0
+        for piece in self._iter_range(len(view)):
+            view[copied:copied + len(piece)] = piece
+            copied += len(piece)
+        return copied
+    
+    def pread_many(self, ranges):
+        """
+        Read several byte ranges at once, fetching them concurrently.
+        
+        Each range is its own Range request on the shared connection pool.
+        The file position, the sequential stream and the block cache are
+        left untouched.
+        
+        Args:
+            ranges: List of (offset, size) tuples
+            
+        Returns:
+            List of bytes, one per range, in the same order; a range that
+            fails to download comes back empty
+        """
+        if self.closed:
+            raise ValueError("I/O operation on closed file")
+        if not ranges:
+            return []
+        
+        with ThreadPoolExecutor(max_workers=min(PREAD_WORKERS, len(ranges))) as executor:
+            return list(executor.map(lambda r: self._range_get(*r), ranges))
+    
+    def _range_get(self, offset, size):
+        """
+        Download one byte range with its own request.
+        
+        Args:
+            offset: File offset of the first byte
+            size: Number of bytes wanted
+            
+        Returns:
+            The bytes received; shorter at end of file, empty on error
+        """
+        if size <= 0:
+            return b''
+        
+        headers = {'Range': f'bytes={offset}-{offset + size - 1}'}
+        try:
+            response = self._session.get(self.url, headers=headers, stream=True)
+            try:
+                if response.status_code == 200 and offset:
+                    # Server ignored the Range header; skip to the offset
+                    if self._skip(response, offset) < offset:
+                        logger.error(f"Stream ended before offset {offset}")
+                        return b''
+                elif response.status_code not in (200, 206):
+                    logger.error(f"Failed to read range from URL: {response.status_code}")
+                    return b''
+                
+                data = bytearray(size)
+                view = memoryview(data)
+                received = 0
+                while received < size:
+                    count = response.raw.readinto(view[received:])
+                    if not count:
+                        break
+                    received += count
+                view.release()
+            finally:
+                response.close()
+        except Exception as e:
+            logger.error(f"Error reading range from URL: {e}")
+            return b''
+        
+        del data[received:]
+        return bytes(data)
+    
     def _read_chunk(self, size):
         """
         Read a chunk of data from the remote file.
@@ -117,33 +270,186 @@ class StreamingModelFile:
         Returns:
             Bytes read from the file
         """
-        # If we have enough data in the buffer, return it
-        if self.position >= self.buffer_start and self.position + size <= self.buffer_end:
-            self.buffer.seek(self.position - self.buffer_start)
-            data = self.buffer.read(size)
-            self.position += len(data)
-            return data
+        return b''.join(self._iter_range(size))
+    
+    def _iter_range(self, size):
+        """
+        Yield the next size bytes of the file as slices of cached blocks.
+        
+        Advances the position past each slice as it is yielded and stops
+        early at end of file or on a download error.
+        
+        Args:
+            size: Number of bytes wanted
             
-        # Otherwise, fetch a new chunk
-        headers = {'Range': f'bytes={self.position}-{self.position + size - 1}'}
-        try:
-            response = self._session.get(self.url, headers=headers, stream=True)
-            if response.status_code in (200, 206):  # OK or Partial Content
-                data = response.content
-                self.position += len(data)
-                
-                # Update buffer
-                self.buffer = io.BytesIO(data)
-                self.buffer_start = self.position - len(data)
-                self.buffer_end = self.position
-                
-                return data
-            else:
-                logger.error(f"Failed to read from URL: {response.status_code}")
+        Yields:
+            memoryview slices of cached blocks
+        """
+        remaining = size
+        while remaining > 0:
+            index, offset = divmod(self.position, self.chunk_size)
+            block = self._get_block(index)
+            length = min(len(block) - offset, remaining)
+            if length <= 0:
+                return
+            
+            self.position += length
+            remaining -= length
+            yield memoryview(block)[offset:offset + length]
+            
+            if len(block) < self.chunk_size:
+                # A short block is the last one in the file
+                return
+    
+    def _get_block(self, index):
+        """
+        Get one chunk_size-aligned block of the file, downloading it if needed.
+        
+        Args:
+            index: Block number (file offset // chunk_size)
+            
+        Returns:
+            The block's bytes; shorter than chunk_size for the last block and
+            empty past the end of the file or on error
+        """
+        block = self._blocks.get(index)
+        if block is not None:
+            self._blocks.move_to_end(index)
+            return block
+        
+        start = index * self.chunk_size
+        length = self.chunk_size
+        if self.content_length:
+            length = min(length, self.content_length - start)
+            if length <= 0:
                 return b''
+        
+        block = bytearray(length)
+        try:
+            received = self._fetch_into(start, memoryview(block))
         except Exception as e:
             logger.error(f"Error reading from URL: {e}")
+            self._close_stream()
+            return b''
+        if received < length:
+            del block[received:]
+        if not block:
             return b''
+        
+        self._blocks[index] = block
+        if len(self._blocks) > MAX_CACHED_BLOCKS:
+            self._blocks.popitem(last=False)
+        return block
+    
+    def _fetch_into(self, start, view):
+        """
+        Download bytes at a file offset straight into a buffer.
+        
+        Args:
+            start: File offset of the first byte wanted
+            view: Writable memoryview to fill; its length is the read size
+            
+        Returns:
+            Number of bytes received; fewer than requested only at end of
+            file or if the request failed
+        """
+        if not self._position_stream(start):
+            return 0
+        
+        size = len(view)
+        received = 0
+        while received < size:
+            count = self._response.raw.readinto(view[received:])
+            if not count:
+                break
+            received += count
+        
+        self._stream_pos += received
+        return received
+    
+    def _position_stream(self, start):
+        """
+        Make sure the open response will next yield the byte at start.
+        
+        Sequential reads keep consuming the same response. Small forward
+        skips are read past; backward or larger seeks reopen the stream
+        with a Range request starting at the new position. A server that
+        ignores the Range header answers 200 with the whole file, which is
+        read past up to start.
+        
+        Args:
+            start: File offset the next read should begin at
+            
+        Returns:
+            True if the stream is ready, False if the request failed
+        """
+        if self._response is not None:
+            skip = start - self._stream_pos
+            if 0 < skip <= self.chunk_size:
+                # Cheaper to read past a small gap than to open a new request
+                skip -= self._discard(skip)
+            if skip == 0:
+                return True
+            self._close_stream()
+        
+        headers = {'Range': f'bytes={start}-'}
+        response = self._session.get(self.url, headers=headers, stream=True)
+        if response.status_code not in (200, 206):  # OK or Partial Content
+            logger.error(f"Failed to read from URL: {response.status_code}")
+            response.close()
+            return False
+        
+        self._response = response
+        if response.status_code == 206:
+            self._stream_pos = start
+            return True
+        
+        # Server ignored the Range header and is sending from the beginning
+        self._stream_pos = 0
+        if start and self._discard(start) < start:
+            logger.error(f"Stream ended before offset {start}")
+            self._close_stream()
+            return False
+        return True
+    
+    def _discard(self, count):
+        """
+        Read and throw away bytes from the open response.
+        
+        Args:
+            count: Number of bytes to skip
+            
+        Returns:
+            Number of bytes skipped; fewer than count only at end of stream
+        """
+        skipped = self._skip(self._response, count)
+        self._stream_pos += skipped
+        return skipped
+    
+    def _skip(self, response, count):
+        """
+        Read past bytes of a response, at most chunk_size at a time.
+        
+        Args:
+            response: Response opened with stream=True
+            count: Number of bytes to skip
+            
+        Returns:
+            Number of bytes skipped; fewer than count only at end of stream
+        """
+        skipped = 0
+        while skipped < count:
+            data = response.raw.read(min(count - skipped, self.chunk_size))
+            if not data:
+                break
+            skipped += len(data)
+        return skipped
+    
+    def _close_stream(self):
+        """Close the open response, if any."""
+        if self._response is not None:
+            self._response.close()
+            self._response = None
     
     def seek(self, offset, whence=0):
         """
@@ -194,14 +500,16 @@ def get_model_info(model_name: str) -> Dict[str, Any]:
     Returns:
         Dict with model information or None if not found
     """
-    # Check cache first
-    with _cache_lock:
-        if model_name in _model_info_cache:
-            # Check if cache is still valid
-            timestamp = _model_info_timestamps.get(model_name, 0)
-            if time.time() - timestamp < _CACHE_TTL:
-                logger.info(f"Using cached model info for {model_name}")
-                return _model_info_cache[model_name]
+    # Check cache first; the read is a single dict.get, so only writers
+    # take the lock
+    entry = _model_info_cache.get(model_name)
+    if entry is not None:
+        # Check if cache is still valid; a cached None records a miss
+        timestamp, cached = entry
+        ttl = _CACHE_TTL if cached is not None else _NEG_CACHE_TTL
+        if time.time() - timestamp < ttl:
+            logger.info(f"Using cached model info for {model_name}")
+            return cached
     
     # Not in cache or expired, get from Dropbox
     if not DROPBOX_ENABLED:
@@ -221,8 +529,7 @@ def get_model_info(model_name: str) -> Dict[str, Any]:
             if result and result.get('success'):
                 # Cache the result
                 with _cache_lock:
-                    _model_info_cache[model_name] = result
-                    _model_info_timestamps[model_name] = time.time()
+                    _model_info_cache[model_name] = (time.time(), result)
                 return result
         
         # Try in the regular models folder
@@ -231,11 +538,13 @@ def get_model_info(model_name: str) -> Dict[str, Any]:
         if result and result.get('success'):
             # Cache the result
             with _cache_lock:
-                _model_info_cache[model_name] = result
-                _model_info_timestamps[model_name] = time.time()
+                _model_info_cache[model_name] = (time.time(), result)
             return result
             
         logger.warning(f"Could not find model {model_name} in Dropbox")
+        # Remember the miss briefly so repeated lookups don't hit Dropbox
+        with _cache_lock:
+            _model_info_cache[model_name] = (time.time(), None)
         return None
         
     except Exception as e:
@@ -289,5 +598,4 @@ def clear_cache():
     """Clear the model info cache."""
     with _cache_lock:
         _model_info_cache.clear()
-        _model_info_timestamps.clear()
     logger.info("Model info cache cleared")
@@ -8,19 +8,93 @@ This module provides functionality to:
 - Store validation results in Dropbox
 """
 
+import errno
+import functools
+import hashlib
 import io
 import os
+import shutil
 import logging
 import json
 import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 from typing import Dict, Any, Optional, Tuple, List
 from datetime import datetime
 
-# Try to import coremltools safely
+# coremltools is heavy, so it is imported on first validation rather than
+# at module import; see _get_coremltools()
+ct = None
+_ct_checked = False
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# PyObjC is only present on macOS, where CoreML predictions leave autoreleased
+# objects behind unless each call runs inside its own autorelease pool
 try:
-    import coremltools as ct
+    import objc
 except ImportError:
-    ct = None
+    objc = None
+
+# Memory-only mode avoids temporary files (set in entrypoint.sh)
+MEMORY_ONLY_MODE = os.environ.get('MEMORY_ONLY_MODE') == 'True'
+
+# Threads used when validation samples are predicted one at a time
+PREDICTION_WORKERS = 2
+
+# Buffer size for copying model data between streams
+COPY_BUFFER_SIZE = 8 * 1024 * 1024
+
+# RAM-backed directory for spooled models; files there count against memory,
+# so it is only used when memory optimization is turned off and the model is
+# known to fit (container /dev/shm is often only 64 MB)
+TMPFS_DIR = '/dev/shm' if os.path.isdir('/dev/shm') else None
+
+# Dropbox folder that validation results are stored in
+VALIDATION_FOLDER = "model_validation"
+
+# Single background thread that uploads validation results, so validation
+# returns without waiting on Dropbox and uploads never overlap
+_upload_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="validation-upload")
+
+# Fields that change on every run (temp_file is a random spool path) and are
+# ignored when comparing results
+_VOLATILE_RESULT_FIELDS = ("timestamp", "duration_seconds", "storage", "temp_file")
+
+# Hash of the last results successfully uploaded to Dropbox
+_last_uploaded_hash = None
+
+# Seconds get_latest_validation_results serves a cached copy before re-fetching
+LATEST_RESULTS_TTL = 60
+
+# (fetch time, parsed results) from the last successful Dropbox fetch
+_latest_results_cache = None
+
+# (sha256 of model bytes, loaded MLModel) for the last model validated, so an
+# unchanged model is not loaded and compiled again
+_loaded_model = None
+
+# Sample texts to test models with, and their prebuilt prediction inputs
+_SAMPLE_TEXTS = (
+    "hello there",
+    "what time is it",
+    "help me with this",
+    "thank you for your help",
+    "goodbye"
+)
+_SAMPLE_FEATURES = [{"text": text} for text in _SAMPLE_TEXTS]
+
+# Template for one sample's test result
+_TEST_RESULT_PROTO = {
+    "input": None,
+    "success": False,
+    "error": None,
+    "output": None,
+    "confidence": None
+}
 
 import config
 
@@ -30,7 +104,7 @@ class ModelValidationError(Exception):
     """Exception raised when model validation fails."""
     pass
 
-def validate_base_model() -> Dict[str, Any]:
+def validate_base_model(sync: bool = False) -> Dict[str, Any]:
     """
     Validate the base model by loading it and checking its structure.
     
@@ -40,6 +114,9 @@ def validate_base_model() -> Dict[str, Any]:
     3. Tests it with sample input
     4. Stores results in Dropbox
     
+    Args:
+        sync: Wait for the Dropbox upload so the returned storage info is final
+        
     Returns:
         Dict with validation results
     """
@@ -60,11 +137,12 @@ def validate_base_model() -> Dict[str, Any]:
     }
     
     # Step 1: Check if CoreML tools are available
+    ct = _get_coremltools()
     if ct is None:
         error = "CoreMLTools not installed - cannot validate model structure"
         validation_results["errors"].append(error)
         logger.error(error)
-        return _store_validation_results(validation_results)
+        return _store_validation_results(validation_results, sync=sync)
     
     # Step 2: Get the base model (either streamed or buffered)
     try:
@@ -85,7 +163,7 @@ def validate_base_model() -> Dict[str, Any]:
                     error = f"Base model {config.BASE_MODEL_NAME} not found"
                     validation_results["errors"].append(error)
                     logger.error(error)
-                    return _store_validation_results(validation_results)
+                    return _store_validation_results(validation_results, sync=sync)
                     
                 validation_results["model_found"] = True
                 logger.info(f"Found base model {config.BASE_MODEL_NAME}")
@@ -98,7 +176,7 @@ def validate_base_model() -> Dict[str, Any]:
                 error = f"Base model {config.BASE_MODEL_NAME} not found"
                 validation_results["errors"].append(error)
                 logger.error(error)
-                return _store_validation_results(validation_results)
+                return _store_validation_results(validation_results, sync=sync)
                 
             validation_results["model_found"] = True
             logger.info(f"Found base model {config.BASE_MODEL_NAME}")
@@ -107,167 +185,199 @@ def validate_base_model() -> Dict[str, Any]:
         error = f"Error loading base model: {str(e)}"
         validation_results["errors"].append(error)
         logger.error(error)
-        return _store_validation_results(validation_results)
+        return _store_validation_results(validation_results, sync=sync)
     
     # Step 3: Prepare model for CoreML validation
+    global _loaded_model
+    model_hash = None
+    memory_only_mode = MEMORY_ONLY_MODE
+    if memory_only_mode:
+        logger.info("Running in memory-only mode - avoiding temporary files")
+    
     try:
-        # Check if we're in memory-only mode (set in entrypoint.sh)
-        memory_only_mode = os.environ.get('MEMORY_ONLY_MODE') == 'True'
-        if memory_only_mode:
-            logger.info("Running in memory-only mode - avoiding temporary files")
-        
         # Check if model_buffer is a streaming object or dict with streaming info
         is_streaming = hasattr(model_buffer, 'read') and hasattr(model_buffer, 'seek') and validation_results.get("streaming", False)
         is_streaming_dict = isinstance(model_buffer, dict) and model_buffer.get('streaming') and model_buffer.get('download_url')
         
-        # Prepare memory buffer for validation
-        import io
-        memory_buffer = io.BytesIO()
-        
-        if is_streaming:
-            # Stream from existing streaming object to memory buffer
-            logger.info("Streaming model to memory buffer for validation")
-            chunk_size = 1024 * 1024  # 1MB chunks
-            while True:
-                chunk = model_buffer.read(chunk_size)
-                if not chunk:
-                    break
-                memory_buffer.write(chunk)
-            # Reset positions
-            model_buffer.seek(0)
-            memory_buffer.seek(0)
-            
-        elif is_streaming_dict:
-            # Stream from URL to memory buffer
-            logger.info("Streaming model from URL to memory buffer")
-            import requests
-            
-            url = model_buffer.get('download_url')
-            
-            # Use streaming requests to avoid loading the entire model at once
-            with requests.get(url, stream=True) as response:
-                if response.status_code == 200:
-                    # Get total size for logging
-                    total_size = int(response.headers.get('content-length', 0))
-                    downloaded = 0
-                    
-                    # Use small chunks to avoid high memory usage
-                    for chunk in response.iter_content(chunk_size=1024*1024):  # 1MB chunks
-                        if chunk:
-                            memory_buffer.write(chunk)
-                            downloaded += len(chunk)
-                            
-                            # Log progress for large models
-                            if total_size > 0 and downloaded % (20*1024*1024) == 0:  # Log every 20MB
-                                logger.info(f"Downloaded {downloaded/(1024*1024):.1f}MB of {total_size/(1024*1024):.1f}MB")
+        if not memory_only_mode:
+            # coremltools loads models from a path, so spool the model straight
+            # to a temporary file instead of building an in-memory copy first
+            source_path = getattr(model_buffer, 'name', None)
+            if isinstance(source_path, str) and os.path.isfile(source_path):
+                # The buffer is an open file on disk; load it from its own path
+                model_path = source_path
+            else:
+                import tempfile
+                spool_dir = _tmpfs_spool_dir(_model_size(model_buffer))
+                while True:
+                    tmp_path = None
+                    try:
+                        with tempfile.NamedTemporaryFile(suffix=".mlmodel", dir=spool_dir, delete=False) as tmp:
+                            tmp_path = tmp.name
+                            validation_results["temp_file"] = tmp_path
+                            # Hash the model while it is written out
+                            writer = _HashingWriter(tmp)
+                
+                            if is_streaming_dict:
+                                logger.info("Streaming model from URL to temporary file")
+                                from utils.model_streamer import get_http_session
                     
-                    memory_buffer.seek(0)
-                    logger.info(f"Successfully streamed {downloaded/(1024*1024):.1f}MB to memory")
-                else:
-                    error = f"Error downloading model: HTTP {response.status_code}"
-                    validation_results["errors"].append(error)
-                    logger.error(error)
-                    return _store_validation_results(validation_results)
+                                with get_http_session().get(model_buffer.get('download_url'), stream=True) as response:
+                                    if response.status_code != 200:
+                                        error = f"Error downloading model: HTTP {response.status_code}"
+                                        validation_results["errors"].append(error)
+                                        logger.error(error)
+                                        del validation_results["temp_file"]
+                                        return _store_validation_results(validation_results, sync=sync)
+                        
+                                    _copy_response_body(response, writer)
+                            else:
+                                logger.info("Writing model to temporary file for validation")
+                                model_buffer.seek(0)
+                                shutil.copyfileobj(model_buffer, writer, length=COPY_BUFFER_SIZE)
+                                model_buffer.seek(0)
+                        break
+                    except OSError as e:
+                        if e.errno != errno.ENOSPC or spool_dir is None:
+                            raise
+                        # tmpfs filled up; spool to the default temp dir instead
+                        logger.warning(f"No space to spool model in {spool_dir}, using default temp dir")
+                        if tmp_path is not None:
+                            os.unlink(tmp_path)
+                        spool_dir = None
+            
+                logger.info(f"Spooled model to {tmp_path} ({os.path.getsize(tmp_path)/(1024*1024):.1f}MB)")
+                model_path = tmp_path
+                model_hash = writer.hexdigest()
         else:
-            # We have a regular buffer
-            logger.info("Copying model buffer for validation")
-            model_buffer.seek(0)
-            memory_buffer.write(model_buffer.read())
-            memory_buffer.seek(0)
+            # Prepare memory buffer for validation
+            memory_buffer = io.BytesIO()
             
-        # Step 4: Load and validate model structure
-        try:
-            # Try to load directly from memory if possible
-            try:
-                logger.info("Attempting to load model directly from memory buffer")
-                model = ct.models.MLModel(memory_buffer)
-                logger.info("Successfully loaded model from memory buffer")
-            except Exception as mem_error:
-                # If direct memory loading fails, we need to use a temp file as fallback
-                logger.warning(f"Could not load model directly from memory: {mem_error}")
+            if isinstance(model_buffer, io.BytesIO):
+                # Already an in-memory buffer; use it as is instead of copying
+                memory_buffer = model_buffer
+                memory_buffer.seek(0)
+            elif is_streaming:
+                # Stream from existing streaming object to memory buffer
+                logger.info("Streaming model to memory buffer for validation")
+                shutil.copyfileobj(model_buffer, memory_buffer, length=COPY_BUFFER_SIZE)
+                # Reset positions
+                model_buffer.seek(0)
+                memory_buffer.seek(0)
                 
-                if memory_only_mode:
-                    # In memory-only mode, create a virtual temp file or fail
-                    try:
-                        from utils.virtual_tempfile import NamedTemporaryFile
-                        with NamedTemporaryFile(suffix=".mlmodel") as tmp:
-                            tmp_path = tmp.name
-                            memory_buffer.seek(0)
-                            tmp.write(memory_buffer.read())
-                            logger.info(f"Using virtual temp file: {tmp_path}")
-                            model = ct.models.MLModel(tmp)
-                    except Exception as vt_error:
-                        error = f"Could not validate model in memory-only mode: {vt_error}"
+            elif is_streaming_dict:
+                # Stream from URL to memory buffer
+                logger.info("Streaming model from URL to memory buffer")
+                from utils.model_streamer import get_http_session
+                
+                url = model_buffer.get('download_url')
+                
+                # Use streaming requests to avoid loading the entire model at once
+                with get_http_session().get(url, stream=True) as response:
+                    if response.status_code == 200:
+                        downloaded = _copy_response_body(response, memory_buffer)
+                        
+                        memory_buffer.seek(0)
+                        logger.info(f"Successfully streamed {downloaded/(1024*1024):.1f}MB to memory")
+                    else:
+                        error = f"Error downloading model: HTTP {response.status_code}"
                         validation_results["errors"].append(error)
                         logger.error(error)
-                        return _store_validation_results(validation_results)
-                else:
-                    # In standard mode, fall back to a physical temp file
-                    import tempfile
-                    with tempfile.NamedTemporaryFile(suffix=".mlmodel", delete=False) as tmp:
-                        tmp_path = tmp.name
-                        memory_buffer.seek(0)
-                        tmp.write(memory_buffer.read())
-                    
-                    logger.info(f"Loading model from temporary file: {tmp_path}")
-                    model = ct.models.MLModel(tmp_path)
-                    
-                    # Add temp file info to results for cleanup later
-                    validation_results["temp_file"] = tmp_path
+                        return _store_validation_results(validation_results, sync=sync)
+            else:
+                # We have a regular buffer
+                logger.info("Copying model buffer for validation")
+                model_buffer.seek(0)
+                shutil.copyfileobj(model_buffer, memory_buffer, length=COPY_BUFFER_SIZE)
+                memory_buffer.seek(0)
             
-            # Get the model specification
-            spec = model.get_spec()
+            with memory_buffer.getbuffer() as view:
+                model_hash = hashlib.sha256(view).hexdigest()
+            
+        # Step 4: Load and validate model structure
+        try:
+            model = None
+            cached = _loaded_model
+            if model_hash is not None and cached is not None and cached[0] == model_hash:
+                logger.info("Model unchanged since last validation, reusing loaded model")
+                model = cached[1]
+                spec = model.get_spec()
+            elif not memory_only_mode:
+                # Parse the spec without compiling the model; the full MLModel
+                # is only loaded if the prediction tests run
+                logger.info(f"Reading model specification from file: {model_path}")
+                spec = ct.models.utils.load_spec(model_path)
+            else:
+                # Try to load directly from memory if possible
+                try:
+                    logger.info("Attempting to load model directly from memory buffer")
+                    model = ct.models.MLModel(memory_buffer)
+                    logger.info("Successfully loaded model from memory buffer")
+                    spec = model.get_spec()
+                except Exception as mem_error:
+                    # Any in-memory fallback would be backed by the same RAM and
+                    # fail the same way, so give up rather than copy the model again
+                    error = f"Could not validate model in memory-only mode: {mem_error}"
+                    validation_results["errors"].append(error)
+                    logger.error(error)
+                    return _store_validation_results(validation_results, sync=sync)
+            
+            # Look up the description message once; every attribute access on a
+            # protobuf message crosses into the C++ runtime. Feature types are
+            # recorded by kind rather than stringifying the whole type message
+            description = spec.description
+            inputs = [{"name": d.name, "type": d.type.WhichOneof('Type') or "unknown"} for d in description.input]
+            outputs = [{"name": d.name, "type": d.type.WhichOneof('Type') or "unknown"} for d in description.output]
             
             # Check basic structure
             validation_results["structure"] = {
                 "specification_version": str(spec.specificationVersion),
                 "type": spec.WhichOneof('Type'),
-                "input_count": len(spec.description.input),
-                "output_count": len(spec.description.output),
-                "inputs": [],
-                "outputs": []
+                "input_count": len(inputs),
+                "output_count": len(outputs),
+                "inputs": inputs,
+                "outputs": outputs
             }
             
-            # Get input descriptions
-            for input_desc in spec.description.input:
-                input_info = {
-                    "name": input_desc.name,
-                    "type": str(input_desc.type)
-                }
-                validation_results["structure"]["inputs"].append(input_info)
-            
-            # Get output descriptions
-            for output_desc in spec.description.output:
-                output_info = {
-                    "name": output_desc.name,
-                    "type": str(output_desc.type)
-                }
-                validation_results["structure"]["outputs"].append(output_info)
-            
             # Get metadata if available
-            if model.user_defined_metadata:
+            user_defined_metadata = description.metadata.userDefined
+            if user_defined_metadata:
                 validation_results["metadata"] = {
-                    k: v for k, v in model.user_defined_metadata.items()
+                    k: v for k, v in user_defined_metadata.items()
                 }
                 
                 # Get intents list if available
-                if 'intents' in model.user_defined_metadata:
-                    intents = model.user_defined_metadata['intents'].split(',')
+                if 'intents' in user_defined_metadata:
+                    intents = user_defined_metadata['intents'].split(',')
                     validation_results["metadata"]["intent_count"] = len(intents)
                     validation_results["metadata"]["intents"] = intents
             
+            # Record the model's content hash for provenance
+            if model_hash is not None:
+                validation_results["metadata"]["sha256"] = model_hash
+            
             logger.info(f"Successfully validated model structure")
             
             # Step 5: Test the model with sample input
-            test_results = _test_model_with_samples(model)
+            if config.VALIDATE_WITH_PREDICTIONS:
+                if model is None:
+                    logger.info(f"Loading model from file: {model_path}")
+                    model = ct.models.MLModel(model_path)
+                test_results = _test_model_with_samples(model)
+            else:
+                logger.info("Prediction tests disabled, skipping model load")
+                test_results = {"skipped": True}
             validation_results["test_results"] = test_results
             
+            if model is not None and model_hash is not None:
+                _loaded_model = (model_hash, model)
+            
             # Set success flag based on results
             validation_results["success"] = True
             if test_results.get("failed_count", 0) > 0:
                 validation_results["warnings"].append(f"{test_results['failed_count']} model tests failed")
                 logger.warning(f"Model validation: {test_results['failed_count']} tests failed")
-            else:
+            elif not test_results.get("skipped"):
                 logger.info("All model tests passed successfully")
                 
         except Exception as e:
@@ -275,9 +385,11 @@ def validate_base_model() -> Dict[str, Any]:
             validation_results["errors"].append(error)
             logger.error(error)
             
-        # Clean up resources
-        memory_only_mode = os.environ.get('MEMORY_ONLY_MODE') == 'True'
-        
+    except Exception as e:
+        error = f"Error preparing model for validation: {str(e)}"
+        validation_results["errors"].append(error)
+        logger.error(error)
+    finally:
         # Clean up memory buffer
         try:
             if 'memory_buffer' in locals():
@@ -285,24 +397,115 @@ def validate_base_model() -> Dict[str, Any]:
         except Exception as e:
             logger.debug(f"Error closing memory buffer: {e}")
             
-        # Clean up temp file if created and not in memory-only mode
+        # Clean up the spooled temp file even if spooling or loading failed
         if not memory_only_mode and 'tmp_path' in locals() and os.path.exists(tmp_path):
             try:
                 os.unlink(tmp_path)
                 logger.debug(f"Deleted temporary file: {tmp_path}")
             except Exception as e:
                 logger.warning(f"Could not delete temp file {tmp_path}: {e}")
-            
-    except Exception as e:
-        error = f"Error preparing model for validation: {str(e)}"
-        validation_results["errors"].append(error)
-        logger.error(error)
     
     # Calculate validation duration
     validation_results["duration_seconds"] = time.time() - start_time
     
     # Store validation results
-    return _store_validation_results(validation_results)
+    return _store_validation_results(validation_results, sync=sync)
+
+def _model_size(model_buffer) -> Optional[int]:
+    """
+    Get the size of a model buffer or streaming info dict, if known.
+    
+    Args:
+        model_buffer: Seekable file object or dict with streaming info
+        
+    Returns:
+        Size in bytes, or None if it can't be determined
+    """
+    if isinstance(model_buffer, dict):
+        return model_buffer.get('size')
+    try:
+        position = model_buffer.tell()
+        size = model_buffer.seek(0, os.SEEK_END)
+        model_buffer.seek(position)
+        return size
+    except Exception:
+        return None
+
+def _tmpfs_spool_dir(size: Optional[int]) -> Optional[str]:
+    """
+    Choose TMPFS_DIR for spooling a model if it has room for it.
+    
+    Args:
+        size: Model size in bytes, or None if unknown
+        
+    Returns:
+        TMPFS_DIR, or None to use the default temp dir
+    """
+    if TMPFS_DIR is None or config.MEMORY_OPTIMIZED or size is None:
+        return None
+    try:
+        st = os.statvfs(TMPFS_DIR)
+    except OSError:
+        return None
+    return TMPFS_DIR if st.f_bavail * st.f_frsize >= size else None
+
+class _HashingWriter:
+    """Write-only file wrapper that hashes everything written through it."""
+    
+    def __init__(self, f):
+        self._f = f
+        self._hasher = hashlib.sha256()
+    
+    def write(self, data) -> int:
+        self._hasher.update(data)
+        return self._f.write(data)
+    
+    def hexdigest(self) -> str:
+        return self._hasher.hexdigest()
+
+def _copy_response_body(response, dst) -> int:
+    """
+    Copy a streamed HTTP response body into a writable file object.
+    
+    Reads straight from the raw stream into one reused buffer, avoiding a new
+    bytes object per chunk.
+    
+    Args:
+        response: Streaming requests response
+        dst: File object to write the decoded body to
+        
+    Returns:
+        int: Number of bytes copied
+    """
+    raw = response.raw
+    raw.decode_content = True
+    buf = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buf)
+    copied = 0
+    while True:
+        n = raw.readinto(view)
+        if not n:
+            break
+        dst.write(view[:n])
+        copied += n
+    return copied
+
+def _get_coremltools():
+    """
+    Import coremltools on first use and cache it on the module.
+    
+    Returns:
+        The coremltools module, or None if it is not installed
+    """
+    global ct, _ct_checked
+    if not _ct_checked:
+        try:
+            import coremltools
+            ct = coremltools
+        except ImportError:
+            ct = None
+        _ct_checked = True
+    return ct
 
 def _test_model_with_samples(model) -> Dict[str, Any]:
     """
@@ -321,71 +524,137 @@ def _test_model_with_samples(model) -> Dict[str, Any]:
         "samples": []
     }
     
-    # Sample texts to test with
-    sample_texts = [
-        "hello there",
-        "what time is it",
-        "help me with this",
-        "thank you for your help",
-        "goodbye"
-    ]
-    
-    # Test each sample
-    for text in sample_texts:
-        test_result = {
-            "input": text,
-            "success": False,
-            "error": None,
-            "output": None,
-            "confidence": None
-        }
+    # Predict all samples in one batch call; fall back to one call per sample
+    # for models or coremltools versions without batch prediction
+    try:
+        with _autorelease_pool():
+            predictions = model.predict(_SAMPLE_FEATURES)
+        if not isinstance(predictions, list) or len(predictions) != len(_SAMPLE_TEXTS):
+            raise ValueError("batch prediction returned an unexpected result")
+        outcomes = [(prediction, None) for prediction in predictions]
+    except Exception as batch_error:
+        logger.debug(f"Batch prediction unavailable, predicting samples one by one: {batch_error}")
+        # Samples are independent and CoreML releases the GIL while predicting
+        with ThreadPoolExecutor(max_workers=PREDICTION_WORKERS) as executor:
+            outcomes = list(executor.map(lambda features: _predict_one(model, features), _SAMPLE_FEATURES))
+    
+    # Map class labels to probability indices once rather than per sample
+    class_to_idx = {c: i for i, c in enumerate(model.classes_)} if hasattr(model, 'classes_') else None
+    
+    # Record each sample's result
+    for text, (prediction, prediction_error) in zip(_SAMPLE_TEXTS, outcomes):
+        test_result = _TEST_RESULT_PROTO.copy()
+        test_result["input"] = text
         
-        try:
-            # Make prediction
-            prediction = model.predict({"text": text})
-            
-            # Extract result
-            intent = None
-            confidence = 0.0
-            
-            # Handle different output formats
-            if isinstance(prediction, dict):
-                # Extract intent and confidence based on available keys
-                if 'intent' in prediction:
-                    intent = prediction['intent']
-                    
-                    # Try to find confidence
-                    if 'probabilities' in prediction:
-                        probs = prediction['probabilities']
-                        if isinstance(probs, dict) and intent in probs:
-                            confidence = probs[intent]
-                        elif isinstance(probs, list) and hasattr(model, 'classes_'):
-                            try:
-                                idx = model.classes_.index(intent)
-                                confidence = probs[idx]
-                            except (ValueError, IndexError):
-                                pass
-            
+        if prediction_error is not None:
+            test_result["error"] = str(prediction_error)
+            test_results["failed_count"] += 1
+        else:
+            intent, confidence = _extract_intent(prediction, class_to_idx)
             test_result["success"] = True
             test_result["output"] = intent
             test_result["confidence"] = confidence
             test_results["passed_count"] += 1
-            
-        except Exception as e:
-            test_result["error"] = str(e)
-            test_results["failed_count"] += 1
         
         test_results["samples"].append(test_result)
         test_results["total_count"] += 1
     
     return test_results
 
-def _store_validation_results(results: Dict[str, Any]) -> Dict[str, Any]:
+def _autorelease_pool():
+    """
+    Get a context manager that drains Objective-C autoreleased objects.
+    
+    Returns:
+        objc.autorelease_pool() on macOS with PyObjC, otherwise a no-op
+    """
+    return objc.autorelease_pool() if objc is not None else nullcontext()
+
+def _predict_one(model, features: Dict[str, Any]) -> Tuple[Any, Optional[Exception]]:
+    """
+    Run one sample prediction inside its own autorelease pool.
+    
+    Args:
+        model: CoreML model instance
+        features: Prediction input for one sample
+        
+    Returns:
+        Tuple of (prediction, error); exactly one of them is None
+    """
+    try:
+        with _autorelease_pool():
+            return model.predict(features), None
+    except Exception as e:
+        return None, e
+
+def _extract_intent(prediction, class_to_idx: Optional[Dict[str, int]]) -> Tuple[Optional[str], float]:
+    """
+    Pull the predicted intent and its confidence out of a model prediction.
+    
+    Args:
+        prediction: Output of model.predict for one sample
+        class_to_idx: Map of class label to probability index, or None if
+            the model does not expose its classes
+        
+    Returns:
+        Tuple of (intent, confidence); intent is None if not present
+    """
+    intent = None
+    confidence = 0.0
+    
+    # Handle different output formats
+    if isinstance(prediction, dict):
+        # Extract intent and confidence based on available keys
+        if 'intent' in prediction:
+            intent = prediction['intent']
+            
+            # Try to find confidence
+            if 'probabilities' in prediction:
+                probs = prediction['probabilities']
+                if isinstance(probs, dict) and intent in probs:
+                    confidence = probs[intent]
+                elif isinstance(probs, list) and class_to_idx is not None:
+                    try:
+                        confidence = probs[class_to_idx[intent]]
+                    except (KeyError, IndexError):
+                        pass
+    
+    return intent, confidence
+
+@functools.lru_cache(maxsize=1)
+def _ensure_validation_folder(dropbox_storage) -> bool:
+    """
+    Make sure the validation folder exists in Dropbox.
+    
+    Cached, so the metadata probe runs once per storage instance rather than
+    on every validation. Failures raise and are not cached.
+    
+    Args:
+        dropbox_storage: DropboxStorage instance
+        
+    Returns:
+        bool: True once the folder is known to exist
+    """
+    folder_path = f"/{VALIDATION_FOLDER}"
+    try:
+        dropbox_storage.dbx.files_get_metadata(folder_path)
+    except Exception:
+        # Create folder if it doesn't exist
+        logger.info(f"Creating validation folder: {folder_path}")
+        dropbox_storage.dbx.files_create_folder_v2(folder_path)
+    return True
+
+def _store_validation_results(results: Dict[str, Any], sync: bool = False) -> Dict[str, Any]:
     """
     Store validation results in Dropbox.
     
+    The upload runs on a background thread so callers get the results back
+    without waiting on Dropbox. Until it finishes, results["storage"] carries
+    "pending": True; the upload thread then fills in the final storage info.
+    
     Args:
         results: Validation results dictionary
+        sync: Wait for the upload to finish before returning
         
     Returns:
         Updated results with storage information
@@ -398,52 +667,134 @@ def _store_validation_results(results: Dict[str, Any]) -> Dict[str, Any]:
         }
         return results
     
+    try:
+        # Skip the uploads when nothing but the run timing has changed
+        results_hash = _results_hash(results)
+        if results_hash == _last_uploaded_hash:
+            logger.info("Validation results unchanged since last upload, skipping Dropbox upload")
+            results["storage"] = {
+                "location": "dropbox",
+                "status": "unchanged"
+            }
+            return results
+        
+        # Encode results once; both uploads share the same bytes
+        payload = _dumps(results)
+        
+        storage = {
+            "location": "dropbox",
+            "pending": True
+        }
+        results["storage"] = storage
+        future = _upload_executor.submit(_upload_validation_results, payload, storage, results_hash)
+        if sync:
+            future.result()
+    
+    except Exception as e:
+        # Handle any exceptions
+        results["storage"] = {
+            "location": "local_only",
+            "reason": f"Error: {str(e)}"
+        }
+        logger.error(f"Error storing validation results: {e}")
+    
+    return results
+
+def _results_hash(results: Dict[str, Any]) -> str:
+    """
+    Hash validation results, ignoring fields that differ between runs.
+    
+    Args:
+        results: Validation results dictionary
+        
+    Returns:
+        str: Hex SHA-256 digest of the canonical JSON encoding
+    """
+    stable = {k: v for k, v in results.items() if k not in _VOLATILE_RESULT_FIELDS}
+    canonical = json.dumps(stable, sort_keys=True, separators=(',', ':'), default=str)
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize data to compact UTF-8 JSON bytes.
+    
+    Uses orjson when it is installed, otherwise the standard library.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _loads(content: bytes) -> Any:
+    """
+    Parse UTF-8 JSON bytes, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+def _upload_validation_results(payload: bytes, storage: Dict[str, Any], results_hash: str) -> None:
+    """
+    Upload encoded validation results to Dropbox and record the outcome.
+    
+    Args:
+        payload: JSON-encoded validation results
+        storage: The results' storage dict, updated in place when done
+        results_hash: Hash of the results, remembered once uploaded
+    """
+    global _last_uploaded_hash
+    
+    def _local_only(reason: str) -> None:
+        storage.clear()
+        storage.update({
+            "location": "local_only",
+            "reason": reason
+        })
+    
     try:
         # Import Dropbox storage
         from utils.dropbox_storage import get_dropbox_storage
         dropbox_storage = get_dropbox_storage()
         
         # Create validation folder if needed
-        validation_folder = "model_validation"
+        validation_folder = VALIDATION_FOLDER
         try:
-            folder_path = f"/{validation_folder}"
-            try:
-                dropbox_storage.dbx.files_get_metadata(folder_path)
-            except Exception:
-                # Create folder if it doesn't exist
-                logger.info(f"Creating validation folder: {folder_path}")
-                dropbox_storage.dbx.files_create_folder_v2(folder_path)
+            _ensure_validation_folder(dropbox_storage)
         except Exception as e:
             logger.warning(f"Error ensuring validation folder exists: {e}")
-            results["storage"] = {
-                "location": "local_only",
-                "reason": f"Dropbox folder creation failed: {str(e)}"
-            }
-            return results
+            _local_only(f"Dropbox folder creation failed: {str(e)}")
+            return
         
         # Create a timestamped filename
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
         filename = f"validation_{timestamp}.json"
         
-        # Convert results to JSON
-        import io
-        json_data = json.dumps(results, indent=2)
-        buffer = io.BytesIO(json_data.encode('utf-8'))
-        
         # Upload to Dropbox
         upload_result = dropbox_storage.upload_model(
-            buffer,
+            io.BytesIO(payload),
             filename,
             validation_folder
         )
         
+        # The cached folder check may be stale if the folder was removed;
+        # re-check it and retry the upload once
+        if upload_result and not upload_result.get('success') and 'not_found' in str(upload_result.get('error', '')):
+            logger.info("Validation folder missing in Dropbox, re-checking and retrying upload")
+            _ensure_validation_folder.cache_clear()
+            _ensure_validation_folder(dropbox_storage)
+            upload_result = dropbox_storage.upload_model(
+                io.BytesIO(payload),
+                filename,
+                validation_folder
+            )
+        
         if upload_result and upload_result.get('success'):
             # Add storage info to results
-            results["storage"] = {
+            storage.pop("pending", None)
+            storage.update({
                 "location": "dropbox",
                 "path": upload_result.get('path'),
                 "timestamp": datetime.now().isoformat()
-            }
+            })
             
             # Try to get download URL
             try:
@@ -452,7 +803,7 @@ def _store_validation_results(results: Dict[str, Any]) -> Dict[str, Any]:
                     folder=validation_folder
                 )
                 if model_info and model_info.get('success') and 'download_url' in model_info:
-                    results["storage"]["download_url"] = model_info['download_url']
+                    storage["download_url"] = model_info['download_url']
             except Exception as e:
                 logger.warning(f"Error getting download URL: {e}")
                 
@@ -460,7 +811,7 @@ def _store_validation_results(results: Dict[str, Any]) -> Dict[str, Any]:
             
             # Also save as latest validation result
             try:
-                latest_buffer = io.BytesIO(json_data.encode('utf-8'))
+                latest_buffer = io.BytesIO(payload)
                 latest_result = dropbox_storage.upload_model(
                     latest_buffer,
                     "latest_validation.json",
@@ -468,39 +819,42 @@ def _store_validation_results(results: Dict[str, Any]) -> Dict[str, Any]:
                 )
                 if latest_result and latest_result.get('success'):
                     logger.info("Updated latest validation results in Dropbox")
+                    _last_uploaded_hash = results_hash
+                    clear_latest_validation_cache()
             except Exception as e:
                 logger.warning(f"Error updating latest validation: {e}")
                 
         else:
             # Handle upload failure
             error = upload_result.get('error', 'Unknown error')
-            results["storage"] = {
-                "location": "local_only",
-                "reason": f"Dropbox upload failed: {error}"
-            }
+            _local_only(f"Dropbox upload failed: {error}")
             logger.warning(f"Failed to upload validation results: {error}")
     
     except Exception as e:
         # Handle any exceptions
-        results["storage"] = {
-            "location": "local_only",
-            "reason": f"Error: {str(e)}"
-        }
+        _local_only(f"Error: {str(e)}")
         logger.error(f"Error storing validation results: {e}")
-    
-    return results
 
 def get_latest_validation_results() -> Dict[str, Any]:
     """
     Get the latest validation results from Dropbox.
     
+    Results are cached for LATEST_RESULTS_TTL seconds, and the cache is
+    cleared whenever new results are uploaded.
+    
     Returns:
         Dict with validation results or empty dict if not found
     """
+    global _latest_results_cache
+    
     if not config.DROPBOX_ENABLED:
         logger.warning("Dropbox not enabled - cannot get validation results")
         return {}
     
+    cached = _latest_results_cache
+    if cached is not None and time.time() - cached[0] < LATEST_RESULTS_TTL:
+        return dict(cached[1])
+    
     try:
         # Import Dropbox storage
         from utils.dropbox_storage import get_dropbox_storage
@@ -509,19 +863,20 @@ def get_latest_validation_results() -> Dict[str, Any]:
         # Try to download latest validation results
         memory_download = dropbox_storage.download_model_to_memory(
             "latest_validation.json",
-            folder="model_validation"
+            folder=VALIDATION_FOLDER
         )
         
         if memory_download and memory_download.get('success'):
             # Parse JSON
             model_buffer = memory_download.get('model_buffer')
             model_buffer.seek(0)
-            json_data = model_buffer.read().decode('utf-8')
+            json_data = model_buffer.read()
             
-            # Parse the JSON data
-            validation_results = json.loads(json_data)
+            # Parse the JSON data; both parsers accept UTF-8 bytes directly
+            validation_results = _loads(json_data)
             logger.info("Successfully loaded latest validation results from Dropbox")
-            return validation_results
+            _latest_results_cache = (time.time(), validation_results)
+            return dict(validation_results)
         
         logger.warning("Latest validation results not found in Dropbox")
         return {}
@@ -529,3 +884,8 @@ def get_latest_validation_results() -> Dict[str, Any]:
     except Exception as e:
         logger.error(f"Error getting latest validation results: {e}")
         return {}
+
+def clear_latest_validation_cache() -> None:
+    """Drop the cached latest validation results so the next call re-fetches."""
+    global _latest_results_cache
+    _latest_results_cache = None
@@ -11,12 +11,19 @@ import io
 import zipfile
 import logging
 import tempfile
+import threading
 import nltk
 from nltk.data import find
 from typing import Dict, List, Any, Optional
 
 logger = logging.getLogger(__name__)
 
+# Chunk size for streaming NLTK resources from Dropbox
+RESOURCE_CHUNK_SIZE = 256 * 1024
+
+# Streamed resources larger than this are spooled to a temporary file
+RESOURCE_SPOOL_MAX_SIZE = 8 * 1024 * 1024
+
 class DropboxResourceProvider:
     """Custom resource provider for NLTK that uses Dropbox storage."""
     
@@ -32,9 +39,19 @@ class DropboxResourceProvider:
         self.nltk_folder = nltk_folder
         self.temp_dir = tempfile.gettempdir()
         
-        # Resource cache to avoid repeated downloads
+        # Resource cache to avoid repeated downloads, keyed by
+        # (resource name, Dropbox rev) so a changed resource is not served stale
         self.resource_cache = {}
         
+        # Last known Dropbox rev of each resource, used to build cache keys
+        self._etags = {}
+        
+        # Resources already looked up and not found in Dropbox
+        self._missing = set()
+        
+        # Serializes Dropbox lookups so concurrent finds don't fetch twice
+        self._lock = threading.Lock()
+        
         # Import inside function to avoid circular imports
         if dropbox_storage is None:
             try:
@@ -55,11 +72,47 @@ class DropboxResourceProvider:
         Returns:
             BytesIO buffer containing the resource data, or None if not found
         """
-        # If we've already cached this resource, return the cached resource
-        if resource_name in self.resource_cache:
+        # Lock-free fast path for resources already resolved
+        cached = self._lookup_cached(resource_name)
+        if cached is not None:
+            return cached
+        if resource_name in self._missing:
+            return None
+        
+        with self._lock:
+            # Another thread may have resolved it while we waited
+            cached = self._lookup_cached(resource_name)
+            if cached is not None:
+                return cached
+            if resource_name in self._missing:
+                return None
+            return self._find_in_dropbox(resource_name)
+    
+    def _lookup_cached(self, resource_name: str) -> Optional[Any]:
+        """
+        Get a cached resource entry under its last known rev.
+        
+        Args:
+            resource_name: Name of the resource
+            
+        Returns:
+            The cached entry, or None if not cached
+        """
+        cached = self.resource_cache.get((resource_name, self._etags.get(resource_name)))
+        if cached is not None:
             logger.debug(f"Found cached NLTK resource: {resource_name}")
-            return self.resource_cache[resource_name]
+        return cached
+    
+    def _find_in_dropbox(self, resource_name: str) -> Optional[str]:
+        """
+        Look a resource up in Dropbox and cache it. Called with self._lock held.
         
+        Args:
+            resource_name: Name of the resource to find
+            
+        Returns:
+            Resource identifier, or None if not found
+        """
         # Check if we have a valid Dropbox storage
         if not self.dropbox_storage:
             logger.warning("Cannot find resource - no Dropbox storage available")
@@ -80,6 +133,14 @@ class DropboxResourceProvider:
                 )
                 
                 if stream_info and stream_info.get('success'):
+                    # Reuse the cached entry if the resource is unchanged upstream
+                    cache_key = (resource_name, stream_info.get('rev'))
+                    self._etags[resource_name] = cache_key[1]
+                    if cache_key in self.resource_cache:
+                        logger.debug(f"NLTK resource unchanged in Dropbox: {resource_name}")
+                        return self.resource_cache[cache_key]['id']
+                    self._drop_cached(resource_name)
+                    
                     # Create an in-memory representation of the resource
                     # This is a virtual path that NLTK will recognize
                     import io
@@ -88,7 +149,7 @@ class DropboxResourceProvider:
                     resource_id = f"memory:{resource_name}"
                     
                     # Store the URL and other information in our cache
-                    self.resource_cache[resource_name] = {
+                    self.resource_cache[cache_key] = {
                         'type': 'stream',
                         'url': stream_info.get('download_url'),
                         'id': resource_id
@@ -100,11 +161,16 @@ class DropboxResourceProvider:
                     class DropboxStreamLoader(CustomLoader):
                         def load(self, resource_url):
                             import requests
-                            # Stream resource directly from Dropbox
-                            response = requests.get(stream_info.get('download_url'))
-                            if response.status_code == 200:
-                                return io.BytesIO(response.content)
-                            return None
+                            # Stream resource directly from Dropbox, spilling large
+                            # resources to disk instead of holding them in memory
+                            with requests.get(stream_info.get('download_url'), stream=True, timeout=30) as response:
+                                if response.status_code != 200:
+                                    return None
+                                buffer = tempfile.SpooledTemporaryFile(max_size=RESOURCE_SPOOL_MAX_SIZE)
+                                for chunk in response.iter_content(chunk_size=RESOURCE_CHUNK_SIZE):
+                                    buffer.write(chunk)
+                            buffer.seek(0)
+                            return buffer
                     
                     # Register our custom loader with NLTK
                     nltk.data.path.append(resource_id)
@@ -131,7 +197,7 @@ class DropboxResourceProvider:
                 resource_id = f"memory:{resource_name}"
                 
                 # Store the buffer in cache
-                self.resource_cache[resource_name] = {
+                self.resource_cache[(resource_name, self._etags.get(resource_name))] = {
                     'type': 'buffer',
                     'data': buffer,
                     'id': resource_id
@@ -141,12 +207,33 @@ class DropboxResourceProvider:
                 return resource_id
                 
             logger.warning(f"NLTK resource not found in Dropbox: {resource_name}")
+            self._missing.add(resource_name)
             return None
             
         except Exception as e:
             logger.error(f"Error finding NLTK resource {resource_name}: {e}")
             return None
     
+    def _drop_cached(self, resource_name: str) -> None:
+        """
+        Remove every cached entry for a resource, whatever its rev.
+        
+        Args:
+            resource_name: Name of the resource
+        """
+        for key in [k for k in self.resource_cache if k[0] == resource_name]:
+            del self.resource_cache[key]
+    
+    def refresh(self) -> None:
+        """
+        Forget known revs and missing resources so the next find() re-checks Dropbox.
+        
+        Cached data is kept and reused for any resource whose rev is unchanged.
+        """
+        with self._lock:
+            self._etags.clear()
+            self._missing.clear()
+    
     def upload_resource(self, resource_path: str, resource_name: str) -> bool:
         """
         Upload an NLTK resource to Dropbox.
@@ -174,6 +261,9 @@ class DropboxResourceProvider:
             
             if result and result.get('success'):
                 logger.info(f"Uploaded NLTK resource to Dropbox: {resource_name}")
+                with self._lock:
+                    self._missing.discard(resource_name)
+                    self._etags.pop(resource_name, None)
                 return True
                 
             logger.error(f"Failed to upload NLTK resource: {result.get('error', 'Unknown error')}")
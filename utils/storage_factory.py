@@ -5,10 +5,13 @@ This module provides an abstraction layer to handle different storage backends
 (local, Dropbox, Google Drive) through a unified interface.
 """
 
+import abc
+import functools
+import io
 import logging
 import os
-import sys
-import tempfile
+import threading
+from types import SimpleNamespace
 from typing import Dict, Any, Optional, List, Union, BinaryIO
 
 logger = logging.getLogger(__name__)
@@ -16,185 +19,338 @@ logger = logging.getLogger(__name__)
 # Import config
 import config
 
-# Storage backends
+# Initialized storage backends, by name
 _storage_backends = {}
 
-class StorageInterface:
-    """Interface that all storage implementations must follow"""
+class StorageInterface(abc.ABC):
+    """
+    Interface that all storage implementations must follow.
+    
+    Backends subclass this, so one missing a required method fails when it
+    is constructed rather than on first call.
+    """
     
+    @abc.abstractmethod
     def get_db_path(self) -> str:
         """Get local path to the database file"""
-        raise NotImplementedError
     
+    @abc.abstractmethod
     def upload_db(self) -> bool:
         """Upload the database to remote storage"""
-        raise NotImplementedError
     
+    @abc.abstractmethod
     def upload_model(self, data_or_path: Union[str, bytes, BinaryIO], model_name: str) -> Dict[str, Any]:
-        """Upload a model file to storage"""
-        raise NotImplementedError
+        """Upload a model file to storage; pass a path or file object rather than bytes"""
     
+    @abc.abstractmethod
     def download_model(self, model_name: str, local_path: Optional[str] = None) -> Dict[str, Any]:
         """Download a model file from storage"""
-        raise NotImplementedError
     
+    @abc.abstractmethod
     def list_models(self) -> List[Dict[str, Any]]:
         """List all model files in storage"""
-        raise NotImplementedError
     
+    @abc.abstractmethod
     def delete_model(self, model_name: str) -> bool:
         """Delete a model file from storage"""
-        raise NotImplementedError
+    
+    def delete_models(self, model_names: List[str]) -> Dict[str, bool]:
+        """Delete several model files; override to batch requests"""
+        return _delete_each(self, model_names)
     
     def download_model_to_memory(self, model_name: str) -> Dict[str, Any]:
-        """Download a model to memory buffer"""
-        raise NotImplementedError
+        """
+        Download a model to memory buffer.
+        
+        The default downloads to a temporary file with download_model and
+        reads it back; backends that can download into memory override it.
+        
+        Args:
+            model_name: Name of the model file
+            
+        Returns:
+            Dict with success, model_buffer, size fields
+        """
+        import tempfile
+        fd, tmp_path = tempfile.mkstemp(suffix=os.path.splitext(model_name)[1])
+        os.close(fd)
+        try:
+            result = self.download_model(model_name, tmp_path)
+            if not result.get('success'):
+                return result
+            with open(tmp_path, 'rb') as f:
+                buffer = io.BytesIO(f.read())
+            return {
+                'success': True,
+                'model_buffer': buffer,
+                'name': model_name,
+                'size': buffer.getbuffer().nbytes
+            }
+        finally:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
     
     def get_model_stream(self, model_name: str) -> Dict[str, Any]:
-        """Get streaming info for a model"""
-        raise NotImplementedError
+        """Get streaming info for a model; not every backend can stream"""
+        return {'success': False, 'error': 'Streaming not supported by this storage backend'}
 
-def initialize_storage():
-    """Initialize storage backends based on configuration"""
-    global _storage_backends
+# Snapshot of the config values the backend factories read, built on first use
+_cfg = None
+
+def _get_config() -> SimpleNamespace:
+    """
+    Get a snapshot of the storage settings from config.
     
-    # Handle tempfile module if it's missing
-    if 'tempfile' not in sys.modules:
-        try:
-            import tempfile
-        except ImportError as e:
-            logger.error(f"Failed to import required module tempfile: {e}")
-            # Create a basic temporary directory function as fallback
-            import random, string
-            def mkdtemp():
-                dirname = ''.join(random.choice(string.ascii_letters) for _ in range(10))
-                path = os.path.join('/tmp', dirname)
-                os.makedirs(path, exist_ok=True)
-                return path
-            # Create a mock tempfile module
-            tempfile = type('tempfile', (), {'mkdtemp': mkdtemp})
-            # Add it to sys.modules so other modules can import it
-            sys.modules['tempfile'] = tempfile
-    
-    # Initialize Dropbox storage if enabled
-    dropbox_initialized = False
-    if getattr(config, 'DROPBOX_ENABLED', False):
-        try:
-            logger.info("Attempting to initialize Dropbox storage")
-            from utils.dropbox_storage import init_dropbox_storage
-            
-            # Use full OAuth parameters if available
-            try:
-                access_token = getattr(config, 'DROPBOX_ACCESS_TOKEN', None)
-                refresh_token = getattr(config, 'DROPBOX_REFRESH_TOKEN', None)
-                app_key = getattr(config, 'DROPBOX_APP_KEY', None)
-                app_secret = getattr(config, 'DROPBOX_APP_SECRET', None)
-                
-                # Check if we have placeholder values and log a warning
-                if (access_token == "YOUR_ACCESS_TOKEN" and refresh_token == "YOUR_REFRESH_TOKEN") or \
-                   (app_key == "YOUR_APP_KEY" or app_secret == "YOUR_APP_SECRET"):
-                    logger.warning(
-                        "Dropbox credentials not properly configured. "
-                        "Using local storage as fallback."
-                    )
-                
-                dropbox_storage = init_dropbox_storage(
-                    api_key=getattr(config, 'DROPBOX_API_KEY', None),
-                    db_filename=getattr(config, 'DROPBOX_DB_FILENAME', 'backdoor_ai_db.db'),
-                    models_folder_name=getattr(config, 'DROPBOX_MODELS_FOLDER', 'backdoor_models'),
-                    access_token=access_token,
-                    refresh_token=refresh_token,
-                    app_key=app_key,
-                    app_secret=app_secret
-                )
-            except Exception as e:
-                logger.warning(f"Error initializing OAuth parameters: {e}")
-                # Fall back to basic initialization if OAuth params are not available
-                dropbox_storage = init_dropbox_storage(
-                    getattr(config, 'DROPBOX_API_KEY', None),
-                    getattr(config, 'DROPBOX_DB_FILENAME', 'backdoor_ai_db.db'),
-                    getattr(config, 'DROPBOX_MODELS_FOLDER', 'backdoor_models')
-                )
-            
-            # Verify we have a valid storage instance with authenticated client
-            if dropbox_storage and hasattr(dropbox_storage, 'dbx') and dropbox_storage.dbx is not None:
-                _storage_backends['dropbox'] = dropbox_storage
-                logger.info("Dropbox storage initialized and authenticated")
-                dropbox_initialized = True
-            else:
-                logger.warning(
-                    "Dropbox storage initialization failed or authentication error. "
-                    "Using local storage as fallback."
-                )
-                
-        except Exception as e:
-            logger.error(f"Failed to initialize Dropbox storage: {e}")
+    Built once and reused; initialize_storage() discards it so a retry picks
+    up changed settings.
     
-    # Initialize Google Drive storage if enabled
-    if getattr(config, 'GOOGLE_DRIVE_ENABLED', False):
-        try:
-            from utils.drive_storage import init_drive_storage
-            drive_storage = init_drive_storage(
-                getattr(config, 'GOOGLE_CREDENTIALS_PATH', 'google_credentials.json'),
-                getattr(config, 'GOOGLE_DRIVE_DB_FILENAME', 'backdoor_ai_db.db'),
-                getattr(config, 'GOOGLE_DRIVE_MODELS_FOLDER', 'backdoor_models')
-            )
-            _storage_backends['google_drive'] = drive_storage
-            logger.info("Google Drive storage initialized")
-        except Exception as e:
-            logger.error(f"Failed to initialize Google Drive storage: {e}")
+    Returns:
+        SimpleNamespace with the backend settings
+    """
+    global _cfg
+    cfg = _cfg
+    if cfg is None:
+        cfg = SimpleNamespace(
+            dropbox_api_key=getattr(config, 'DROPBOX_API_KEY', None),
+            dropbox_access_token=getattr(config, 'DROPBOX_ACCESS_TOKEN', None),
+            dropbox_refresh_token=getattr(config, 'DROPBOX_REFRESH_TOKEN', None),
+            dropbox_app_key=getattr(config, 'DROPBOX_APP_KEY', None),
+            dropbox_app_secret=getattr(config, 'DROPBOX_APP_SECRET', None),
+            dropbox_db_filename=getattr(config, 'DROPBOX_DB_FILENAME', 'backdoor_ai_db.db'),
+            dropbox_models_folder=getattr(config, 'DROPBOX_MODELS_FOLDER', 'backdoor_models'),
+            google_credentials_path=getattr(config, 'GOOGLE_CREDENTIALS_PATH', 'google_credentials.json'),
+            google_drive_db_filename=getattr(config, 'GOOGLE_DRIVE_DB_FILENAME', 'backdoor_ai_db.db'),
+            google_drive_models_folder=getattr(config, 'GOOGLE_DRIVE_MODELS_FOLDER', 'backdoor_models'),
+            db_path=getattr(config, 'DB_PATH', 'data/db.sqlite'),
+            model_dir=getattr(config, 'MODEL_DIR', 'models'),
+        )
+        _cfg = cfg
+    return cfg
+
+def _init_dropbox():
+    """
+    Initialize and authenticate the Dropbox backend.
     
-    # Always initialize local storage as fallback
+    Returns:
+        DropboxStorage instance, or None if it could not be authenticated
+    """
+    logger.info("Attempting to initialize Dropbox storage")
+    from utils.dropbox_storage import init_dropbox_storage
+    
+    cfg = _get_config()
+    
+    # Use full OAuth parameters if available
     try:
-        from utils.local_storage import init_local_storage
-        
-        # Ensure we have valid paths for local storage
-        db_path = getattr(config, 'DB_PATH', 'data/db.sqlite')
-        model_dir = getattr(config, 'MODEL_DIR', 'models')
+        access_token = cfg.dropbox_access_token
+        refresh_token = cfg.dropbox_refresh_token
+        app_key = cfg.dropbox_app_key
+        app_secret = cfg.dropbox_app_secret
         
-        # If we're using memory DB path, create a real file path for local storage
-        if db_path.startswith("memory:"):
-            try:
-                temp_dir = tempfile.mkdtemp()
-                db_path = os.path.join(temp_dir, "local_fallback.db")
-                logger.info(f"Using temporary file for local storage fallback: {db_path}")
-            except Exception as te:
-                logger.error(f"Error creating temp directory: {te}")
-                # Use a direct path as fallback
-                db_path = "/tmp/local_fallback.db"
-        
-        # Initialize local storage with validated paths
-        local_storage = init_local_storage(db_path, model_dir)
-        _storage_backends['local'] = local_storage
-        logger.info("Local storage initialized")
+        # Check if we have placeholder values and log a warning
+        if (access_token == "YOUR_ACCESS_TOKEN" and refresh_token == "YOUR_REFRESH_TOKEN") or \
+           (app_key == "YOUR_APP_KEY" or app_secret == "YOUR_APP_SECRET"):
+            logger.warning(
+                "Dropbox credentials not properly configured. "
+                "Using local storage as fallback."
+            )
         
-        # If Dropbox was supposed to be used but failed, update config
-        if getattr(config, 'STORAGE_MODE', 'local') == 'dropbox' and not dropbox_initialized:
-            if hasattr(config, 'STORAGE_MODE'):
-                config.STORAGE_MODE = 'local'
-                logger.info("Updated config to use local storage mode due to Dropbox auth failure")
-            
+        dropbox_storage = init_dropbox_storage(
+            api_key=cfg.dropbox_api_key,
+            db_filename=cfg.dropbox_db_filename,
+            models_folder_name=cfg.dropbox_models_folder,
+            access_token=access_token,
+            refresh_token=refresh_token,
+            app_key=app_key,
+            app_secret=app_secret
+        )
     except Exception as e:
-        logger.error(f"Failed to initialize local storage: {e}")
-        
-        # Create a basic in-memory fallback as last resort
+        logger.warning(f"Error initializing OAuth parameters: {e}")
+        # Fall back to basic initialization if OAuth params are not available
+        dropbox_storage = init_dropbox_storage(
+            cfg.dropbox_api_key,
+            cfg.dropbox_db_filename,
+            cfg.dropbox_models_folder
+        )
+    
+    # Verify we have a valid storage instance with authenticated client
+    if dropbox_storage and hasattr(dropbox_storage, 'dbx') and dropbox_storage.dbx is not None:
+        logger.info("Dropbox storage initialized and authenticated")
+        return dropbox_storage
+    
+    logger.warning(
+        "Dropbox storage initialization failed or authentication error. "
+        "Using local storage as fallback."
+    )
+    return None
+
+def _init_drive():
+    """
+    Initialize the Google Drive backend.
+    
+    Returns:
+        DriveStorage instance
+    """
+    from utils.drive_storage import init_drive_storage
+    cfg = _get_config()
+    drive_storage = init_drive_storage(
+        cfg.google_credentials_path,
+        cfg.google_drive_db_filename,
+        cfg.google_drive_models_folder
+    )
+    logger.info("Google Drive storage initialized")
+    return drive_storage
+
+def _init_local():
+    """
+    Initialize the local filesystem backend.
+    
+    Returns:
+        LocalStorage instance
+    """
+    from utils.local_storage import init_local_storage
+    
+    # Ensure we have valid paths for local storage
+    cfg = _get_config()
+    db_path = cfg.db_path
+    model_dir = cfg.model_dir
+    
+    # If we're using memory DB path, create a real file path for local storage
+    if db_path.startswith("memory:"):
         try:
-            # Import at function level to avoid circular imports
-            from utils.memory_db import init_memory_db
-            
-            # Make sure tempfile is available to memory_db module
+            import tempfile
+            temp_dir = tempfile.mkdtemp()
+            db_path = os.path.join(temp_dir, "local_fallback.db")
+            logger.info(f"Using temporary file for local storage fallback: {db_path}")
+        except Exception as te:
+            logger.error(f"Error creating temp directory: {te}")
+            # Use a direct path as fallback
+            db_path = "/tmp/local_fallback.db"
+    
+    # Initialize local storage with validated paths
+    local_storage = init_local_storage(db_path, model_dir)
+    logger.info("Local storage initialized")
+    return local_storage
+
+def _init_memory():
+    """
+    Initialize the in-memory database used as an emergency fallback.
+    
+    Returns:
+        In-memory database connection
+    """
+    # Import at function level to avoid circular imports
+    from utils.memory_db import init_memory_db
+    
+    memory_db = init_memory_db()
+    logger.warning("Using in-memory storage as emergency fallback")
+    return memory_db
+
+# Backend factories, called on first use of each backend. Each backend's SDK
+# is only imported (and authenticated) when that backend is actually needed.
+_factories = {
+    'dropbox': _init_dropbox,
+    'google_drive': _init_drive,
+    'local': _init_local,
+    'memory': _init_memory,
+}
+
+# Config flags a backend needs switched on before it may be initialized
+_enable_flags = {
+    'dropbox': 'DROPBOX_ENABLED',
+    'google_drive': 'GOOGLE_DRIVE_ENABLED',
+}
+
+# Backends whose factory has run, whether or not it succeeded
+_attempted = set()
+
+# Serializes backend initialization so concurrent first calls init only once
+_init_lock = threading.RLock()
+
+def register_backend(name: str, factory, config_flag: Optional[str] = None):
+    """
+    Register a storage backend factory.
+    
+    The factory is only called the first time the backend is requested, so
+    registering a backend does not import its SDK.
+    
+    Args:
+        name: Backend name used with get_storage and config.STORAGE_MODE
+        factory: Callable returning the backend instance, or None on failure
+        config_flag: Optional config attribute that must be true to enable it
+    """
+    with _init_lock:
+        _factories[name] = factory
+        if config_flag:
+            _enable_flags[name] = config_flag
+        else:
+            _enable_flags.pop(name, None)
+        _attempted.discard(name)
+    _resolve_storage.cache_clear()
+
+def _get_backend(storage_type: str):
+    """
+    Get an initialized backend, running its factory on first use.
+    
+    Args:
+        storage_type: Backend name, a key of _factories
+        
+    Returns:
+        The backend instance, or None if it is disabled or failed to initialize
+    """
+    backend = _storage_backends.get(storage_type)
+    if backend is not None or storage_type in _attempted:
+        return backend
+    
+    flag = _enable_flags.get(storage_type)
+    if flag and not getattr(config, flag, False):
+        return None
+    
+    factory = _factories.get(storage_type)
+    if factory is None:
+        return None
+    
+    with _init_lock:
+        if storage_type not in _attempted:
             try:
-                # Add tempfile to sys.modules if it's not there
-                if 'tempfile' not in sys.modules:
-                    sys.modules['tempfile'] = tempfile
-            except Exception:
-                logger.warning("Could not set up tempfile for memory DB, some features may be limited")
-                
-            memory_db = init_memory_db()
-            _storage_backends['memory'] = memory_db
-            logger.warning("Using in-memory storage as emergency fallback")
-        except Exception as me:
-            logger.critical(f"Even in-memory fallback failed: {me}")
+                backend = factory()
+                if backend is not None:
+                    _storage_backends[storage_type] = backend
+            except Exception as e:
+                logger.error(f"Failed to initialize {storage_type} storage: {e}")
+            _attempted.add(storage_type)
+    return _storage_backends.get(storage_type)
+
+def initialize_storage():
+    """
+    Initialize the configured storage backend.
+    
+    Other backends are initialized lazily by get_storage the first time they
+    are requested. Backends that failed before are retried.
+    """
+    global _cfg
+    
+    with _init_lock:
+        _cfg = None
+        _attempted.difference_update(
+            name for name in list(_attempted) if name not in _storage_backends
+        )
+    _resolve_storage.cache_clear()
+    
+    storage_mode = getattr(config, 'STORAGE_MODE', 'local')
+    if _get_backend(storage_mode) is not None:
+        return
+    
+    # If Dropbox was supposed to be used but failed, update config
+    if storage_mode == 'dropbox':
+        if hasattr(config, 'STORAGE_MODE'):
+            config.STORAGE_MODE = 'local'
+            logger.info("Updated config to use local storage mode due to Dropbox auth failure")
+    
+    # Make sure a fallback is ready
+    if _get_backend('local') is None:
+        if _get_backend('memory') is None:
             logger.critical("Application may not function correctly without storage")
 
 def get_storage(storage_type: Optional[str] = None) -> StorageInterface:
@@ -211,38 +367,142 @@ def get_storage(storage_type: Optional[str] = None) -> StorageInterface:
     Raises:
         RuntimeError: If requested storage is not available
     """
-    # Initialize if not already done
-    if not _storage_backends:
-        initialize_storage()
-    
     # Use configured default if not specified
-    if storage_type is None:
-        storage_type = getattr(config, 'STORAGE_MODE', 'local')
+    return _resolve_storage(storage_type or getattr(config, 'STORAGE_MODE', 'local'))
+
+@functools.lru_cache(maxsize=8)
+def _resolve_storage(storage_type: str) -> StorageInterface:
+    """
+    Resolve a storage type to a backend, applying the fallback rules.
+    
+    Cached per storage type; initialize_storage() clears the cache.
+    
+    Args:
+        storage_type: Type of storage requested
+    
+    Returns:
+        StorageInterface implementation
     
+    Raises:
+        RuntimeError: If no storage is available
+    """
     # If Dropbox is requested but not available or not authenticated, use fallback
-    if storage_type == 'dropbox' and (
-        'dropbox' not in _storage_backends or 
-        not hasattr(_storage_backends['dropbox'], 'dbx') or
-        _storage_backends['dropbox'].dbx is None
-    ):
-        logger.warning("Dropbox storage not available or not authenticated, falling back to local storage")
-        storage_type = 'local'
+    if storage_type == 'dropbox':
+        dropbox_storage = _get_backend('dropbox')
+        if dropbox_storage is None or getattr(dropbox_storage, 'dbx', None) is None:
+            logger.warning("Dropbox storage not available or not authenticated, falling back to local storage")
+            storage_type = 'local'
     
     # Check if requested storage is available
-    if storage_type in _storage_backends:
-        storage = _storage_backends[storage_type]
+    storage = _get_backend(storage_type)
+    if storage is not None:
         return storage
     
     # Fall back to local storage
-    if 'local' in _storage_backends:
+    storage = _get_backend('local')
+    if storage is not None:
         logger.warning(f"Requested storage '{storage_type}' not available, falling back to local storage")
-        return _storage_backends['local']
+        return storage
     
     # Memory fallback if local isn't available
-    if 'memory' in _storage_backends:
+    storage = _get_backend('memory')
+    if storage is not None:
         logger.warning(f"Falling back to emergency in-memory storage (data will be lost on restart)")
-        return _storage_backends['memory']
+        return storage
     
     # If no storage is available, raise an error
     logger.critical("No storage backends available. Application will not function correctly.")
     raise RuntimeError(f"No storage backends available. Requested: {storage_type}")
+
+# Lets callers drop resolved backends, e.g. after changing config.STORAGE_MODE
+get_storage.cache_clear = _resolve_storage.cache_clear
+
+def delete_models(storage, model_names: List[str]) -> Dict[str, bool]:
+    """
+    Delete several models from a backend.
+    
+    Uses the backend's own delete_models (which can batch requests) when it
+    has one, and otherwise deletes the models one at a time.
+    
+    Args:
+        storage: Storage backend
+        model_names: Names of the models to delete
+        
+    Returns:
+        Dict mapping each model name to True if it was deleted
+    """
+    batch_delete = getattr(storage, 'delete_models', None)
+    if batch_delete is not None:
+        return batch_delete(model_names)
+    return _delete_each(storage, model_names)
+
+def _delete_each(storage, model_names: List[str]) -> Dict[str, bool]:
+    """
+    Delete models one at a time with the backend's delete_model.
+    
+    Args:
+        storage: Storage backend
+        model_names: Names of the models to delete
+        
+    Returns:
+        Dict mapping each model name to True if it was deleted
+    """
+    results = {}
+    for name in model_names:
+        try:
+            results[name] = bool(storage.delete_model(name))
+        except Exception as e:
+            logger.error(f"Error deleting model {name}: {e}")
+            results[name] = False
+    return results
+
+def _prime_configured_backend() -> None:
+    """
+    Initialize the configured backend and make one cheap API call with it.
+    
+    The call forces any pending token refresh and opens the pooled HTTPS
+    connection, so the first real request doesn't pay for either.
+    """
+    try:
+        storage = get_storage()
+        dbx = getattr(storage, 'dbx', None)
+        drive = getattr(storage, 'drive', None)
+        if dbx is not None:
+            dbx.users_get_current_account()
+        elif drive is not None:
+            drive.GetAbout()
+        logger.info(f"Storage backend warmed up: {type(storage).__name__}")
+    except Exception as e:
+        logger.warning(f"Storage warmup failed: {e}")
+
+def warmup(async_: bool = True) -> Optional[threading.Thread]:
+    """
+    Warm up the configured storage backend.
+    
+    Args:
+        async_: Run on a daemon thread instead of blocking the caller
+        
+    Returns:
+        The warmup thread if async_, otherwise None
+    """
+    if not async_:
+        _prime_configured_backend()
+        return None
+    
+    thread = threading.Thread(target=_prime_configured_backend, name="storage-warmup", daemon=True)
+    thread.start()
+    return thread
+
+def __getattr__(name: str):
+    """
+    Resolve backends as module attributes, e.g. storage_factory.local.
+    
+    Args:
+        name: Backend name ('local', 'dropbox', 'google_drive' or 'memory')
+        
+    Returns:
+        The backend, with the same fallbacks as get_storage(name)
+    """
+    if name in _factories:
+        return get_storage(name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
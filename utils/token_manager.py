@@ -8,36 +8,108 @@ and expiration tracking automatically.
 
 import os
 import json
+import tempfile
 import time
 import logging
+import threading
 import requests
-from datetime import datetime, timedelta
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from concurrent.futures import Future
+from datetime import datetime
 from typing import Dict, Any, Optional, Tuple
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 logger = logging.getLogger(__name__)
 
-class TokenManager:
-    """Centralized OAuth2 token management for Dropbox."""
+# Seconds a caller waits for a refresh started by another thread
+REFRESH_WAIT_TIMEOUT = 30
+
+# Shortest sleep between background refresh checks, in seconds
+BACKGROUND_REFRESH_MIN_INTERVAL = 30
+
+# (connect, read) timeouts for the token endpoint
+TOKEN_REQUEST_TIMEOUT = (3.05, 10)
+
+# Keep-alive session for the token endpoint, shared across refreshes
+_http_session = None
+_http_session_lock = threading.Lock()
+
+def _get_http_session() -> requests.Session:
+    """
+    Get the HTTP session used for token refreshes.
     
-    _instance = None  # Singleton instance
+    Reusing one session keeps the TLS connection to the token endpoint
+    alive between refreshes.
     
-    def __new__(cls, *args, **kwargs):
-        """Ensure singleton pattern for token management."""
-        if cls._instance is None:
-            cls._instance = super(TokenManager, cls).__new__(cls)
-            cls._instance._initialized = False
-        return cls._instance
+    Returns:
+        requests.Session: Session with a small, retrying HTTPS adapter
+    """
+    global _http_session
+    
+    with _http_session_lock:
+        if _http_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(
+                pool_connections=1,
+                pool_maxsize=4,
+                max_retries=Retry(
+                    total=2,
+                    backoff_factor=0.2,
+                    status_forcelist=[429, 500, 502, 503, 504],
+                    allowed_methods=frozenset(['POST'])
+                )
+            )
+            session.mount('https://', adapter)
+            _http_session = session
+        return _http_session
+
+# Settings TokenManager reads from the environment or config module
+_CONFIG_KEYS = (
+    "DROPBOX_APP_KEY",
+    "DROPBOX_APP_SECRET",
+    "DROPBOX_REFRESH_TOKEN",
+    "DROPBOX_AUTO_REFRESH",
+    "DROPBOX_ACCESS_TOKEN",
+    "DROPBOX_TOKEN_EXPIRY",
+)
+
+def _dumps(data: Dict[str, Any]) -> bytes:
+    """
+    Serialize data to compact UTF-8 JSON bytes.
+    
+    Uses orjson when it is installed, otherwise the standard library.
+    """
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':')).encode('utf-8')
+
+def _loads(content: bytes) -> Any:
+    """
+    Parse UTF-8 JSON bytes, using orjson when it is installed.
+    """
+    if orjson is not None:
+        return orjson.loads(content)
+    return json.loads(content)
+
+class TokenManager:
+    """Centralized OAuth2 token management for Dropbox."""
     
     def __init__(self, config=None):
         """
         Initialize the token manager with application config.
         
+        Use get_token_manager() to share one instance across the process.
+        
         Args:
             config: Application config module (falls back to importing config)
         """
-        # Only initialize once due to singleton pattern
-        if self._initialized:
-            return
+        # Parsed expiry as a Unix timestamp, kept in step with expiry_time
+        self._expiry_epoch: Optional[float] = None
             
         # Import config if not provided
         if config is None:
@@ -51,6 +123,7 @@ class TokenManager:
             self.config = config
         
         # Essential configuration
+        self._cfg = self._snapshot_config()
         self.tokens_file = "dropbox_tokens.json"
         self.app_key = self._get_config("DROPBOX_APP_KEY")
         self.app_secret = self._get_config("DROPBOX_APP_SECRET")
@@ -64,8 +137,16 @@ class TokenManager:
         self.access_token = self._get_config("DROPBOX_ACCESS_TOKEN")
         self.expiry_time = self._get_config("DROPBOX_TOKEN_EXPIRY")
         self.last_refresh_attempt = 0
+        self._last_saved = None  # (access_token, refresh_token, expiry_time) in the file
+        self._tokens_stat = None  # (mtime_ns, size) of the tokens file when last read or written
         self.refresh_cooldown = 60  # Minimum seconds between refresh attempts
         
+        # Concurrent callers share one in-flight refresh
+        self._refresh_lock = threading.Lock()
+        self._refresh_inflight: Optional[Future] = None
+        self._refresh_thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        
         # Load tokens from file
         self._load_tokens()
         
@@ -77,8 +158,6 @@ class TokenManager:
             else:
                 logger.warning("Refresh token not set, please configure DROPBOX_REFRESH_TOKEN")
         
-        self._initialized = True
-        
         # Log the token status
         if self.refresh_token and self.refresh_token != "YOUR_REFRESH_TOKEN":
             if self.access_token:
@@ -88,9 +167,46 @@ class TokenManager:
         else:
             logger.warning("Token manager initialized without a valid refresh token")
     
+    @property
+    def expiry_time(self) -> Optional[str]:
+        """Access token expiry as an ISO 8601 string, as persisted."""
+        return self._expiry_time
+    
+    @expiry_time.setter
+    def expiry_time(self, value: Optional[str]):
+        self._set_expiry(value)
+    
+    def _set_expiry(self, iso_str: Optional[str]):
+        """
+        Store the expiry time and parse it once for expiry checks.
+        
+        Args:
+            iso_str: Expiry time as an ISO 8601 string, or None if unknown
+        """
+        self._expiry_time = iso_str
+        if not iso_str:
+            self._expiry_epoch = None
+            return
+        try:
+            self._expiry_epoch = datetime.fromisoformat(iso_str).timestamp()
+        except (ValueError, TypeError) as e:
+            logger.error(f"Error parsing expiry time: {e}")
+            # Treat an unreadable expiry as already expired
+            self._expiry_epoch = 0.0
+    
+    def _set_expiry_epoch(self, epoch: float):
+        """
+        Store the expiry from a Unix timestamp, without re-parsing it.
+        
+        Args:
+            epoch: Expiry time in seconds since the epoch
+        """
+        self._expiry_epoch = epoch
+        self._expiry_time = datetime.fromtimestamp(epoch).isoformat()
+    
     def _get_config(self, key, default=None):
         """
-        Get a configuration value safely.
+        Get a configuration value from the snapshot taken at initialization.
         
         Args:
             key: The configuration key
@@ -99,36 +215,74 @@ class TokenManager:
         Returns:
             The configuration value or default
         """
-        # First try environment variable
-        env_value = os.environ.get(key)
-        if env_value is not None:
-            return env_value
-            
-        # Then try config module
-        if self.config is not None:
-            return getattr(self.config, key, default)
-            
-        # Fall back to default
-        return default
+        return self._cfg.get(key, default)
+    
+    def _snapshot_config(self) -> Dict[str, Any]:
+        """
+        Read the token settings once from the environment and config module.
+        
+        Environment variables take precedence over the config module.
+        
+        Returns:
+            Dict of the settings that are set, keyed by name
+        """
+        snapshot = {}
+        for key in _CONFIG_KEYS:
+            if key in os.environ:
+                snapshot[key] = os.environ[key]
+            elif self.config is not None and hasattr(self.config, key):
+                snapshot[key] = getattr(self.config, key)
+        return snapshot
     
-    def _load_tokens(self):
-        """Load tokens from the token file if it exists."""
+    def _load_tokens(self) -> bool:
+        """
+        Load tokens from the token file if it exists and has changed.
+        
+        Returns:
+            bool: True if tokens were read from the file
+        """
         try:
-            if os.path.exists(self.tokens_file):
-                with open(self.tokens_file, 'r') as f:
-                    tokens = json.load(f)
-                
-                # Update current tokens from file
-                if "access_token" in tokens:
-                    self.access_token = tokens["access_token"]
-                if "refresh_token" in tokens and tokens["refresh_token"] != "YOUR_REFRESH_TOKEN":
-                    self.refresh_token = tokens["refresh_token"]
-                if "expiry_time" in tokens:
-                    self.expiry_time = tokens["expiry_time"]
-                    
-                logger.info("Loaded tokens from file")
+            try:
+                st = os.stat(self.tokens_file)
+            except FileNotFoundError:
+                return False
+            
+            # Skip parsing when the file is unchanged since we last read or wrote it
+            tokens_stat = (st.st_mtime_ns, st.st_size)
+            if tokens_stat == self._tokens_stat:
+                return False
+            
+            with open(self.tokens_file, 'rb') as f:
+                tokens = _loads(f.read())
+            
+            # Update current tokens from file
+            if "access_token" in tokens:
+                self.access_token = tokens["access_token"]
+            if "refresh_token" in tokens and tokens["refresh_token"] != "YOUR_REFRESH_TOKEN":
+                self.refresh_token = tokens["refresh_token"]
+            if "expiry_time" in tokens:
+                self.expiry_time = tokens["expiry_time"]
+            self._last_saved = (tokens.get("access_token"), tokens.get("refresh_token"),
+                                tokens.get("expiry_time"))
+            self._tokens_stat = tokens_stat
+            
+            logger.info("Loaded tokens from file")
+            return True
         except Exception as e:
             logger.error(f"Error loading tokens from file: {e}")
+            return False
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Re-read the tokens file if another process has changed it.
+        
+        Cheap when nothing changed: the file is only parsed if its mtime or
+        size differs from when it was last read or written.
+        
+        Returns:
+            bool: True if new tokens were loaded
+        """
+        return self._load_tokens()
     
     def _save_tokens(self):
         """Save current tokens to the token file."""
@@ -140,11 +294,32 @@ class TokenManager:
             
             if self.expiry_time:
                 tokens["expiry_time"] = self.expiry_time
+            
+            # Only rewrite the file when the tokens actually changed
+            saved = (self.access_token, self.refresh_token, tokens.get("expiry_time"))
+            if saved != self._last_saved:
+                # Write to a uniquely named temporary file and swap it in so
+                # readers never see a partial file and writers never share one
+                fd, tmp_path = tempfile.mkstemp(
+                    dir=os.path.dirname(os.path.abspath(self.tokens_file)),
+                    prefix=os.path.basename(self.tokens_file) + ".",
+                    suffix=".tmp"
+                )
+                try:
+                    with os.fdopen(fd, 'wb') as f:
+                        f.write(_dumps(tokens))
+                    os.replace(tmp_path, self.tokens_file)
+                except BaseException:
+                    try:
+                        os.unlink(tmp_path)
+                    except OSError:
+                        pass
+                    raise
+                self._last_saved = saved
+                st = os.stat(self.tokens_file)
+                self._tokens_stat = (st.st_mtime_ns, st.st_size)
                 
-            with open(self.tokens_file, 'w') as f:
-                json.dump(tokens, f, indent=2)
-                
-            logger.info("Saved tokens to file")
+                logger.info("Saved tokens to file")
             
             # Update config module if available
             if self.config is not None:
@@ -156,10 +331,11 @@ class TokenManager:
                 except Exception as e:
                     logger.warning(f"Error updating config module: {e}")
             
-            # Always update environment variables
-            os.environ["DROPBOX_ACCESS_TOKEN"] = self.access_token
-            if self.expiry_time:
-                os.environ["DROPBOX_TOKEN_EXPIRY"] = self.expiry_time
+            # Keep environment variables in step, calling putenv only on change
+            for key, value in (("DROPBOX_ACCESS_TOKEN", self.access_token),
+                               ("DROPBOX_TOKEN_EXPIRY", self.expiry_time)):
+                if value and os.environ.get(key) != value:
+                    os.environ[key] = value
                 
         except Exception as e:
             logger.error(f"Error saving tokens to file: {e}")
@@ -176,27 +352,21 @@ class TokenManager:
             return True
             
         # Check if token is expired or will expire soon
-        if self.expiry_time:
-            try:
-                expiry = datetime.fromisoformat(self.expiry_time)
-                now = datetime.now()
+        if self._expiry_epoch is not None:
+            seconds_to_expiry = self._expiry_epoch - time.time()
+            
+            # Refresh if expired or expiring soon
+            if seconds_to_expiry <= 0:
+                logger.info("Token has expired")
+                return True
                 
-                # Refresh if expired or expiring soon
-                if expiry <= now:
-                    logger.info("Token has expired")
-                    return True
-                    
-                # Refresh if expiring within threshold
-                seconds_to_expiry = (expiry - now).total_seconds()
-                if seconds_to_expiry <= self.refresh_threshold_seconds:
-                    logger.info(f"Token expires in {seconds_to_expiry:.1f} seconds, refreshing")
-                    return True
-            except (ValueError, TypeError) as e:
-                logger.error(f"Error parsing expiry time: {e}")
+            # Refresh if expiring within threshold
+            if seconds_to_expiry <= self.refresh_threshold_seconds:
+                logger.info(f"Token expires in {seconds_to_expiry:.1f} seconds, refreshing")
                 return True
         
         # If we have no expiry information but have both tokens, assume we need refresh
-        if self.access_token and self.refresh_token and not self.expiry_time:
+        elif self.access_token and self.refresh_token:
             logger.info("No expiry information, refreshing to be safe")
             return True
             
@@ -209,29 +379,88 @@ class TokenManager:
         Returns:
             bool: True if refresh was successful or not needed
         """
-        # Check if we're attempting refresh too frequently
-        current_time = time.time()
-        if current_time - self.last_refresh_attempt < self.refresh_cooldown:
-            logger.debug("Skipping refresh, attempted too recently")
-            return False
-            
-        self.last_refresh_attempt = current_time
+        with self._refresh_lock:
+            inflight = self._refresh_inflight
+            if inflight is None:
+                # Check if we're attempting refresh too frequently
+                current_time = time.time()
+                if current_time - self.last_refresh_attempt < self.refresh_cooldown:
+                    logger.debug("Skipping refresh, attempted too recently")
+                    return False
+                    
+                self.last_refresh_attempt = current_time
+                
+                # Check if refresh is needed
+                if not self._should_refresh():
+                    return True  # Token is still valid
+                    
+                # Check if we have the necessary credentials
+                if not self.refresh_token:
+                    logger.error("Cannot refresh token: No refresh token available")
+                    return False
+                    
+                if not self.app_key or not self.app_secret:
+                    logger.error("Cannot refresh token: Missing app credentials")
+                    return False
+                
+                self._refresh_inflight = Future()
+        
+        # Another thread is already refreshing; wait for its result
+        if inflight is not None:
+            try:
+                return inflight.result(timeout=REFRESH_WAIT_TIMEOUT)
+            except Exception as e:
+                logger.warning(f"Timed out waiting for token refresh: {e}")
+                return False
         
-        # Check if refresh is needed
-        if not self._should_refresh():
-            return True  # Token is still valid
-            
-        # Check if we have the necessary credentials
-        if not self.refresh_token:
-            logger.error("Cannot refresh token: No refresh token available")
-            return False
-            
-        if not self.app_key or not self.app_secret:
-            logger.error("Cannot refresh token: Missing app credentials")
-            return False
-            
         # Perform token refresh
-        return self._refresh_access_token()
+        success = False
+        try:
+            success = self._refresh_access_token()
+        finally:
+            with self._refresh_lock:
+                inflight = self._refresh_inflight
+                self._refresh_inflight = None
+            inflight.set_result(success)
+        
+        # Keep the token fresh in the background from now on
+        if success and self.auto_refresh:
+            self._start_refresh_thread()
+        return success
+    
+    def _start_refresh_thread(self):
+        """Start the background refresh thread unless it is already running."""
+        with self._refresh_lock:
+            if self._refresh_thread is not None and self._refresh_thread.is_alive():
+                return
+            self._refresh_thread = threading.Thread(
+                target=self._refresh_loop, name="token-refresh", daemon=True
+            )
+            self._refresh_thread.start()
+    
+    def close(self):
+        """Stop the background refresh thread, if it is running."""
+        self._stop_event.set()
+    
+    def _refresh_loop(self):
+        """
+        Refresh the access token shortly before it expires.
+        
+        Runs in a daemon thread so request handlers normally find a valid
+        token without waiting on the token endpoint. refresh_token_if_needed
+        remains the fallback if this thread falls behind.
+        """
+        while not self._stop_event.is_set():
+            expiry = self._expiry_epoch or 0.0
+            delay = expiry - time.time() - self.refresh_threshold_seconds
+            if self._stop_event.wait(max(BACKGROUND_REFRESH_MIN_INTERVAL, delay)):
+                return
+            try:
+                # Pick up a token another process refreshed before refreshing ourselves
+                self.reload_if_changed()
+                self.refresh_token_if_needed()
+            except Exception as e:
+                logger.error(f"Error in background token refresh: {e}")
     
     def _refresh_access_token(self) -> bool:
         """
@@ -247,12 +476,17 @@ class TokenManager:
             token_url = "https://api.dropboxapi.com/oauth2/token"
             data = {
                 "grant_type": "refresh_token",
-                "refresh_token": self.refresh_token,
-                "client_id": self.app_key,
-                "client_secret": self.app_secret
+                "refresh_token": self.refresh_token
             }
             
-            response = requests.post(token_url, data=data)
+            # Client credentials go in a Basic auth header rather than the form body
+            response = _get_http_session().post(
+                token_url,
+                data=data,
+                auth=(self.app_key, self.app_secret),
+                headers={"Accept": "application/json"},
+                timeout=TOKEN_REQUEST_TIMEOUT
+            )
             if response.status_code != 200:
                 logger.error(f"Token refresh failed: {response.status_code} - {response.text}")
                 return False
@@ -263,9 +497,7 @@ class TokenManager:
             
             # Calculate and store expiry time
             if "expires_in" in token_data:
-                expires_in = token_data["expires_in"]
-                expiry_time = datetime.now() + timedelta(seconds=expires_in)
-                self.expiry_time = expiry_time.isoformat()
+                self._set_expiry_epoch(int(time.time()) + token_data["expires_in"])
                 
             # Save the updated tokens
             self._save_tokens()
@@ -284,6 +516,15 @@ class TokenManager:
         Returns:
             str: Valid access token or None if unavailable
         """
+        # Fast path: token is known to be valid beyond the refresh threshold
+        access_token = self.access_token
+        expiry = self._expiry_epoch
+        if access_token and expiry and time.time() + self.refresh_threshold_seconds < expiry:
+            return access_token
+        
+        # Another process may already have saved a fresh token
+        self.reload_if_changed()
+        
         # Try to refresh the token if needed
         if self.auto_refresh and self._should_refresh():
             self.refresh_token_if_needed()
@@ -297,21 +538,11 @@ class TokenManager:
         Returns:
             Dict with token status information
         """
-        # Check expiry status
-        is_expired = False
-        expires_in = None
-        
-        if self.expiry_time:
-            try:
-                expiry = datetime.fromisoformat(self.expiry_time)
-                now = datetime.now()
-                
-                if expiry <= now:
-                    is_expired = True
-                else:
-                    expires_in = (expiry - now).total_seconds()
-            except (ValueError, TypeError):
-                is_expired = True
+        # Check expiry status from the cached epoch
+        expiry = self._expiry_epoch
+        seconds_to_expiry = expiry - time.time() if expiry is not None else None
+        is_expired = seconds_to_expiry is not None and seconds_to_expiry <= 0
+        expires_in = None if is_expired else seconds_to_expiry
         
         return {
             "has_access_token": bool(self.access_token),
@@ -323,14 +554,39 @@ class TokenManager:
             "auto_refresh": self.auto_refresh
         }
 
-# Initialize singleton instance
-token_manager = TokenManager()
+# Singleton instance, created on first use so importing this module does no I/O
+_token_manager = None
+_token_manager_lock = threading.Lock()
 
 def get_token_manager() -> TokenManager:
     """
-    Get the singleton TokenManager instance.
+    Get the singleton TokenManager instance, creating it on first call.
     
     Returns:
         TokenManager: The singleton instance
     """
-    return token_manager
+    global _token_manager
+    
+    if _token_manager is None:
+        with _token_manager_lock:
+            if _token_manager is None:
+                _token_manager = TokenManager()
+    return _token_manager
+
+def reset_token_manager():
+    """
+    Discard the shared TokenManager so the next get_token_manager() call
+    builds a fresh one, e.g. after changing credentials or between tests.
+    """
+    global _token_manager
+    
+    with _token_manager_lock:
+        token_manager, _token_manager = _token_manager, None
+    if token_manager is not None:
+        token_manager.close()
+
+def __getattr__(name: str):
+    """Keep `from utils.token_manager import token_manager` working lazily."""
+    if name == 'token_manager':
+        return get_token_manager()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")